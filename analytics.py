@@ -0,0 +1,535 @@
+"""
+Chat Analytics (write-behind)
+Answered questions are handed to a bounded in-memory queue on the request thread (never
+blocking; overflow is counted and dropped) and written in batches by a background worker
+to a pluggable sink: Postgres (the chat_logs / popular_questions tables in the README)
+when DATABASE_URL is set, or SQLite / JSON lines when asked for (under the temp directory
+unless ANALYTICS_PATH says otherwise); by default nothing is persisted. Popular-question and
+latency rollups are updated incrementally per batch, separately for each twin. The queue
+is drained on exit.
+
+    ANALYTICS_SINK=jsonl ANALYTICS_PATH=/var/log/twin/chat_logs.jsonl python server.py
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from heapq import nlargest
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from health import LatencyWindow
+from metrics import registry
+from response_cache import normalize_query
+from twin_registry import DEFAULT_TWIN_ID, current_twin_id
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "true").lower() != "false"
+# 'postgres', 'sqlite', 'jsonl' or 'none' (rollups only, nothing persisted)
+ANALYTICS_SINK = os.getenv("ANALYTICS_SINK", "postgres" if DATABASE_URL else "none").lower()
+ANALYTICS_PATH = os.getenv("ANALYTICS_PATH", "")  # Local sink file; defaults per sink below
+ANALYTICS_QUEUE_SIZE = 10000
+ANALYTICS_BATCH_SIZE = 200
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "2.0"))
+ANALYTICS_MAX_TRACKED_QUESTIONS = 10000  # In-memory popular-question rollup size
+ANALYTICS_SHUTDOWN_TIMEOUT_SECONDS = 10.0
+
+# The working directory may be read-only (e.g. on Vercel); the temp directory is writable
+DEFAULT_PATHS = {
+    'sqlite': os.path.join(tempfile.gettempdir(), 'analytics.sqlite3'),
+    'jsonl': os.path.join(tempfile.gettempdir(), 'chat_logs.jsonl'),
+}
+
+ANALYTICS_EVENTS = registry.counter('twin_analytics_events_total', 'Chat analytics events by outcome', ['outcome'])
+
+class ChatEvent(NamedTuple):
+    """One answered question; columns of the chat_logs table"""
+    query: str
+    response: str
+    response_time: float
+    vector_hits: Optional[int]
+    query_category: str
+    created_at: float  # Unix time; converted by the sink
+    user_ip: Optional[str]
+    user_agent: Optional[str]
+    source: str
+    twin_id: str = DEFAULT_TWIN_ID
+
+CHAT_LOG_COLUMNS = ('query', 'response', 'response_time', 'vector_hits', 'query_category',
+                    'created_at', 'user_ip', 'user_agent', 'twin_id')
+
+# Fields merged into every event recorded in this context, e.g. the HTTP client
+_request_context: ContextVar[Dict[str, Any]] = ContextVar('analytics_request_context', default={})
+
+@contextmanager
+def request_context(**fields: Any) -> Iterator[None]:
+    """Attribute events recorded inside the block, e.g. request_context(source='http', user_ip=ip)"""
+    token = _request_context.set(fields)
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+class QuestionStats:
+    __slots__ = ('twin_id', 'question', 'category', 'count', 'total_time', 'last_asked')
+
+    def __init__(self, twin_id: str, question: str, category: str):
+        self.twin_id = twin_id
+        self.question = question
+        self.category = category
+        self.count = 0
+        self.total_time = 0.0
+        self.last_asked = 0.0
+
+    def add(self, response_time: float, asked_at: float) -> None:
+        self.count += 1
+        self.total_time += response_time
+        self.last_asked = max(self.last_asked, asked_at)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'twin_id': self.twin_id,
+            'question': self.question,
+            'category': self.category,
+            'ask_count': self.count,
+            'avg_response_time': round(self.total_time / self.count, 4) if self.count else 0.0,
+            'last_asked': datetime.fromtimestamp(self.last_asked, timezone.utc).isoformat(),
+        }
+
+def aggregate_questions(events: List[ChatEvent],
+                        known: Optional[Dict[Tuple[str, str], QuestionStats]] = None
+                        ) -> Dict[Tuple[str, str], QuestionStats]:
+    """
+    Per-question totals of a batch, keyed by (twin ID, normalized question)
+    Paraphrases share one row; its text is the first wording seen (from known, across batches)
+    """
+    totals: Dict[Tuple[str, str], QuestionStats] = {}
+    known = known or {}
+    for event in events:
+        key = (event.twin_id, normalize_query(event.query) or event.query.lower())
+        stats = totals.get(key)
+        if stats is None:
+            first = known.get(key)
+            stats = totals[key] = QuestionStats(event.twin_id, first.question if first else event.query,
+                                                first.category if first else event.query_category)
+        stats.add(event.response_time, event.created_at)
+    return totals
+
+class AnalyticsRollup:
+    """Running popular-question and latency aggregates per twin, merged one batch at a time"""
+
+    def __init__(self, max_questions: int = ANALYTICS_MAX_TRACKED_QUESTIONS):
+        self.max_questions = max_questions
+        self.questions: Dict[Tuple[str, str], QuestionStats] = {}
+        self.categories: Dict[Tuple[str, str], List[float]] = {}  # (twin, category) -> [count, total seconds]
+        self.latency: Dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    def merge(self, events: List[ChatEvent], batch_questions: Dict[Tuple[str, str], QuestionStats]) -> None:
+        with self._lock:
+            for event in events:
+                latency = self.latency.get(event.twin_id)
+                if latency is None:
+                    latency = self.latency[event.twin_id] = LatencyWindow()
+                latency.record(event.response_time)
+                totals = self.categories.setdefault((event.twin_id, event.query_category), [0, 0.0])
+                totals[0] += 1
+                totals[1] += event.response_time
+            for key, batch in batch_questions.items():
+                stats = self.questions.get(key)
+                if stats is None:
+                    # The sink still counts questions beyond the cap; only the in-memory view is bounded
+                    if len(self.questions) >= self.max_questions:
+                        continue
+                    stats = self.questions[key] = QuestionStats(batch.twin_id, batch.question, batch.category)
+                stats.count += batch.count
+                stats.total_time += batch.total_time
+                stats.last_asked = max(stats.last_asked, batch.last_asked)
+
+    def popular(self, twin_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        with self._lock:
+            top = nlargest(limit, (stats for stats in self.questions.values() if stats.twin_id == twin_id),
+                           key=lambda stats: stats.count)
+            return [stats.as_dict() for stats in top]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Latency, per-category counts and top questions for each twin that has been asked something"""
+        with self._lock:
+            latency = dict(self.latency)
+            categories: Dict[str, Dict[str, Any]] = {}
+            for (twin_id, category), (count, total) in self.categories.items():
+                categories.setdefault(twin_id, {})[category] = {
+                    'count': count, 'avg_response_time': round(total / count, 4)
+                }
+        return {'twins': {
+            twin_id: {'latency': window.percentiles(), 'categories': categories.get(twin_id, {}),
+                      'popular': self.popular(twin_id, 5)}
+            for twin_id, window in latency.items()
+        }}
+
+class JsonlSink:
+    """Appends one JSON object per event; rollups are derivable from the log"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, events: List[ChatEvent], questions: Dict[Tuple[str, str], QuestionStats]) -> None:
+        lines = []
+        for event in events:
+            record = event._asdict()
+            record['created_at'] = datetime.fromtimestamp(event.created_at, timezone.utc).isoformat()
+            lines.append(json.dumps(record, ensure_ascii=False))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def close(self) -> None:
+        pass
+
+class SqlSink:
+    """
+    chat_logs inserts plus incremental popular_questions upserts in one transaction per batch
+    Subclasses supply the connection, DDL and parameter placeholder.
+    """
+    placeholder = '?'
+    create_statements: tuple = ()
+    # Columns added after the first release; each may already exist, so failures are ignored
+    migrate_statements: tuple = ()
+
+    def __init__(self):
+        self._connection = None
+
+    def connect(self) -> Any:
+        raise NotImplementedError
+
+    def timestamp(self, created_at: float) -> Any:
+        return datetime.fromtimestamp(created_at, timezone.utc)
+
+    def connection(self) -> Any:
+        if self._connection is None:
+            connection = self.connect()
+            cursor = connection.cursor()
+            for statement in self.create_statements:
+                cursor.execute(statement)
+            connection.commit()
+            for statement in self.migrate_statements:
+                try:
+                    cursor.execute(statement)
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+            self._connection = connection
+        return self._connection
+
+    def write(self, events: List[ChatEvent], questions: Dict[Tuple[str, str], QuestionStats]) -> None:
+        p = self.placeholder
+        connection = self.connection()
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(
+                f"INSERT INTO chat_logs ({', '.join(CHAT_LOG_COLUMNS)}) VALUES ({', '.join([p] * len(CHAT_LOG_COLUMNS))})",
+                [(event.query, event.response, event.response_time, event.vector_hits, event.query_category,
+                  self.timestamp(event.created_at), event.user_ip, event.user_agent, event.twin_id) for event in events]
+            )
+            for stats in questions.values():
+                last_asked = self.timestamp(stats.last_asked)
+                # SET expressions see the pre-update row, so the average is re-weighted by the old count
+                cursor.execute(
+                    f"UPDATE popular_questions SET "
+                    f"avg_response_time = (COALESCE(avg_response_time, 0) * ask_count + {p}) / (ask_count + {p}), "
+                    f"ask_count = ask_count + {p}, last_asked = {p} WHERE twin_id = {p} AND question_text = {p}",
+                    (stats.total_time, stats.count, stats.count, last_asked, stats.twin_id, stats.question)
+                )
+                if cursor.rowcount == 0:
+                    cursor.execute(
+                        f"INSERT INTO popular_questions (twin_id, question_type, question_text, ask_count, avg_response_time, last_asked) "
+                        f"VALUES ({p}, {p}, {p}, {p}, {p}, {p})",
+                        (stats.twin_id, stats.category, stats.question, stats.count, stats.total_time / stats.count, last_asked)
+                    )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class SqliteSink(SqlSink):
+    create_statements = (
+        """CREATE TABLE IF NOT EXISTS chat_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            query TEXT NOT NULL,
+            response TEXT NOT NULL,
+            response_time REAL,
+            vector_hits INTEGER,
+            query_category TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            user_ip TEXT,
+            user_agent TEXT,
+            twin_id TEXT DEFAULT 'default'
+        )""",
+        """CREATE TABLE IF NOT EXISTS popular_questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            twin_id TEXT DEFAULT 'default',
+            question_type TEXT,
+            question_text TEXT,
+            ask_count INTEGER DEFAULT 1,
+            avg_response_time REAL,
+            last_asked TEXT DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS popular_questions_text ON popular_questions (question_text)",
+    )
+    migrate_statements = (
+        "ALTER TABLE chat_logs ADD COLUMN twin_id TEXT DEFAULT 'default'",
+        "ALTER TABLE popular_questions ADD COLUMN twin_id TEXT DEFAULT 'default'",
+    )
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+
+    def connect(self) -> Any:
+        import sqlite3
+        return sqlite3.connect(self.path)
+
+    def timestamp(self, created_at: float) -> Any:
+        return datetime.fromtimestamp(created_at, timezone.utc).isoformat()
+
+class PostgresSink(SqlSink):
+    placeholder = '%s'
+    create_statements = (
+        """CREATE TABLE IF NOT EXISTS chat_logs (
+            id SERIAL PRIMARY KEY,
+            query TEXT NOT NULL,
+            response TEXT NOT NULL,
+            response_time FLOAT,
+            vector_hits INTEGER,
+            query_category VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_ip VARCHAR(45),
+            user_agent TEXT,
+            twin_id VARCHAR(64) DEFAULT 'default'
+        )""",
+        """CREATE TABLE IF NOT EXISTS popular_questions (
+            id SERIAL PRIMARY KEY,
+            twin_id VARCHAR(64) DEFAULT 'default',
+            question_type VARCHAR(100),
+            question_text TEXT,
+            ask_count INTEGER DEFAULT 1,
+            avg_response_time FLOAT,
+            last_asked TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS popular_questions_text ON popular_questions (question_text)",
+    )
+    migrate_statements = (
+        "ALTER TABLE chat_logs ADD COLUMN IF NOT EXISTS twin_id VARCHAR(64) DEFAULT 'default'",
+        "ALTER TABLE popular_questions ADD COLUMN IF NOT EXISTS twin_id VARCHAR(64) DEFAULT 'default'",
+    )
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+
+    def connect(self) -> Any:
+        return import_postgres_driver().connect(self.dsn)
+
+    def timestamp(self, created_at: float) -> Any:
+        # chat_logs uses TIMESTAMP without time zone; store UTC
+        return datetime.fromtimestamp(created_at, timezone.utc).replace(tzinfo=None)
+
+def import_postgres_driver() -> Optional[Any]:
+    """psycopg (3) or psycopg2, imported on first use; None when neither is installed"""
+    for name in ('psycopg', 'psycopg2'):
+        try:
+            return __import__(name)
+        except ImportError:
+            continue
+    return None
+
+def create_sink(kind: str = ANALYTICS_SINK, path: str = ANALYTICS_PATH) -> Optional[Any]:
+    """Sink for the configured backend; None for 'none' (rollups only)"""
+    if kind == 'postgres':
+        if not DATABASE_URL:
+            logger.warning("ANALYTICS_SINK=postgres but DATABASE_URL is not set, writing to SQLite instead")
+            kind = 'sqlite'
+        elif import_postgres_driver() is None:
+            logger.error("❌ No Postgres driver installed (pip install psycopg or psycopg2-binary), "
+                         "analytics are kept as in-memory rollups only")
+            return None
+        else:
+            return PostgresSink(DATABASE_URL)
+    if kind == 'sqlite':
+        return SqliteSink(path or DEFAULT_PATHS['sqlite'])
+    if kind == 'jsonl':
+        return JsonlSink(path or DEFAULT_PATHS['jsonl'])
+    return None
+
+_STOP = object()
+
+class AnalyticsRecorder:
+    """Bounded queue plus a background worker that batches events into the sink"""
+
+    def __init__(self, sink: Optional[Any], queue_size: int = ANALYTICS_QUEUE_SIZE,
+                 batch_size: int = ANALYTICS_BATCH_SIZE, flush_seconds: float = ANALYTICS_FLUSH_SECONDS):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.rollup = AnalyticsRollup()
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def record(self, event: ChatEvent) -> None:
+        """Request-path side: enqueue or, when the writer has fallen behind, drop and count"""
+        if self._thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(event)
+            ANALYTICS_EVENTS.inc(outcome='queued')
+        except queue.Full:
+            self.dropped += 1
+            ANALYTICS_EVENTS.inc(outcome='dropped')
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+            self._thread.start()
+            # Flush what is still queued on interpreter exit
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = ANALYTICS_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Drain the queue into the sink and stop the worker"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            thread = self._thread
+        if thread is None:
+            return
+        self.queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"⚠️ Analytics writer still flushing after {timeout}s, {self.queue.qsize()} events unwritten")
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if stopping:
+                batch += self._drain()
+            for start in range(0, len(batch), self.batch_size):
+                self._flush(batch[start:start + self.batch_size])
+        if self.sink is not None:
+            try:
+                self.sink.close()
+            except Exception as e:
+                logger.error(f"❌ Closing analytics sink failed: {str(e)}")
+
+    def _collect(self) -> Tuple[List[ChatEvent], bool]:
+        """Up to batch_size events, waiting at most flush_seconds after the first one arrives"""
+        batch: List[ChatEvent] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_seconds
+        return batch, False
+
+    def _drain(self) -> List[ChatEvent]:
+        events = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return events
+            if item is not _STOP:
+                events.append(item)
+
+    def _flush(self, events: List[ChatEvent]) -> None:
+        # Only this worker thread mutates the rollup, so reading its questions here is safe
+        questions = aggregate_questions(events, self.rollup.questions)
+        self.rollup.merge(events, questions)
+        if self.sink is None:
+            return
+        try:
+            self.sink.write(events, questions)
+            self.written += len(events)
+            ANALYTICS_EVENTS.inc(len(events), outcome='written')
+        except Exception as e:
+            self.failed += len(events)
+            ANALYTICS_EVENTS.inc(len(events), outcome='failed')
+            logger.error(f"❌ Writing {len(events)} analytics events failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sink': type(self.sink).__name__ if self.sink is not None else None,
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            **self.rollup.snapshot(),
+        }
+
+_recorder: Optional[AnalyticsRecorder] = None
+_recorder_lock = threading.Lock()
+
+def get_recorder() -> Optional[AnalyticsRecorder]:
+    """Process-wide recorder, created on first use; None when analytics are disabled"""
+    global _recorder
+    if not ANALYTICS_ENABLED:
+        return None
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = AnalyticsRecorder(create_sink())
+    return _recorder
+
+def record_chat(query: str, response: str, response_time: float, query_category: str = '',
+                vector_hits: Optional[int] = None, twin_id: Optional[str] = None) -> None:
+    """
+    Queue one answered question; attribution comes from the enclosing request_context()
+    twin_id defaults to the twin the enclosing use_twin() block is answering for
+    """
+    recorder = get_recorder()
+    if recorder is None:
+        return
+    context = _request_context.get()
+    recorder.record(ChatEvent(
+        query, response, response_time, vector_hits, query_category, time.time(),
+        context.get('user_ip'), context.get('user_agent'), context.get('source', 'mcp'),
+        twin_id or current_twin_id()
+    ))
+
+def analytics_stats() -> Dict[str, Any]:
+    recorder = get_recorder()
+    return recorder.stats() if recorder is not None else {'enabled': False}
+
+def shutdown() -> None:
+    """Flush and stop the recorder (also registered with atexit once it starts)"""
+    if _recorder is not None:
+        _recorder.stop()
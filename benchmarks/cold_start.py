@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Cold Start Benchmark
+Times fresh interpreter starts: importing the HTTP entry point and the retrieval module,
+serving a first /health and a first query, and the eager path (import + prewarm) that
+every cold start used to pay before clients, data and indexes became lazy.
+
+    python benchmarks/cold_start.py --runs 10
+    RETRIEVER_BACKEND=upstash python benchmarks/cold_start.py   # include Upstash client setup
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each scenario runs in a new interpreter and prints its elapsed milliseconds
+SCENARIOS = {
+    'import index.py': """
+import index
+""",
+    'import retrieval module': """
+import digital_twin_mcp_server_optimized
+""",
+    'first /health (entry point)': """
+import io, index
+class Request(index.handler):
+    def __init__(self):
+        self.path, self.headers, self.wfile = '/health', {}, io.BytesIO()
+        self.request_version = 'HTTP/1.1'
+    def send_response(self, code, message=None): pass
+    def send_header(self, key, value): pass
+    def end_headers(self): pass
+Request().do_GET()
+""",
+    'first query (lazy)': """
+import digital_twin_mcp_server_optimized as retrieval
+retrieval.mcp_answer_query('What are your core skills?')
+""",
+    'import + prewarm (eager)': """
+import digital_twin_mcp_server_optimized as retrieval
+retrieval.prewarm(background=False)
+""",
+}
+
+TIMER = """
+import time
+_started = time.perf_counter()
+{body}
+print((time.perf_counter() - _started) * 1000)
+"""
+
+def run_scenario(body: str, env: Dict[str, str]) -> float:
+    """Run one scenario in a fresh interpreter and return its elapsed ms"""
+    output = subprocess.run(
+        [sys.executable, '-c', TIMER.format(body=body.strip())],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def benchmark(runs: int) -> Dict[str, Dict[str, float]]:
+    env = dict(os.environ)
+    env.setdefault('RETRIEVER_BACKEND', 'local')
+    env['ANALYTICS_SINK'] = 'none'
+    env['PYTHONPATH'] = REPO_DIR
+    results = {}
+    for name, body in SCENARIOS.items():
+        samples: List[float] = [run_scenario(body, env) for _ in range(runs)]
+        results[name] = {
+            'median_ms': round(statistics.median(samples), 1),
+            'min_ms': round(min(samples), 1),
+            'max_ms': round(max(samples), 1),
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import and first-request latency of fresh processes")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per scenario")
+    parser.add_argument('--json', action='store_true', help="Print raw JSON instead of a table")
+    args = parser.parse_args()
+
+    results = benchmark(args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenario':32} {'median':>10} {'min':>10} {'max':>10}")
+        for name, stats in results.items():
+            print(f"{name:32} {stats['median_ms']:>8.1f}ms {stats['min_ms']:>8.1f}ms {stats['max_ms']:>8.1f}ms")
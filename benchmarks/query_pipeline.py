@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Query Pipeline Benchmark
+Replays a seeded, realistic query mix against mcp_answer_query and the index.py handler,
+with FakeIndex standing in for Upstash (injected latency and failure rate), and reports
+throughput, p50/p95/p99 latency, cache hit rate and memory per scenario.
+
+    python benchmarks/query_pipeline.py
+    python benchmarks/query_pipeline.py --scenarios vector,cached --target http --concurrency 8
+    python benchmarks/query_pipeline.py --save baseline.json
+    python benchmarks/query_pipeline.py --baseline baseline.json --max-regression 0.2   # exit 1 on regression
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+# Keep the analytics queue and rollups in the measured path, but write nothing to disk
+os.environ.setdefault("ANALYTICS_SINK", "none")
+
+import digital_twin_mcp_server_optimized as retrieval
+import index
+from fake_index import FakeIndex
+from ingest import chunk_to_vector
+from response_cache import SemanticQueryCache
+from twin_chunks import build_chunks
+from vector_client import CircuitBreaker, ResilientIndex
+
+# (weight, query) - head of the distribution repeats, so the cached path gets real hits
+QUERY_MIX = [
+    (12, "What are your core competencies?"),
+    (10, "Tell me about your experience"),
+    (8, "What methodologies do you use?"),
+    (6, "What is your stakeholder management approach?"),
+    (6, "What was your biggest achievement at Etisalat?"),
+    (5, "Tell me about your work at Asurion"),
+    (5, "What are your skills in requirements analysis?"),
+    (4, "Who are you and where are you located?"),
+    (4, "Give me a summary about yourself"),
+    (3, "what are ur core competencies"),
+    (3, "Describe your experience with agile delivery"),
+    (3, "How do you handle conflicting stakeholder requirements?"),
+]
+
+# Long tail: unique questions that always miss the cache
+TAIL_TEMPLATES = [
+    "How did you use {topic} in your previous role?",
+    "Can you give an example of {topic}?",
+    "What tools do you use for {topic}?",
+]
+TAIL_TOPICS = [
+    "process mapping", "data analysis", "user stories", "UAT", "digital transformation",
+    "change management", "SQL reporting", "workshops", "business cases", "gap analysis",
+]
+TAIL_FRACTION = 0.15
+
+# name -> fake index behaviour and cache mode
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    'vector': {'vector': True, 'cache': False, 'description': "vector path, cache off"},
+    'fallback': {'vector': False, 'cache': False, 'description': "no vector DB, local BM25 fallback"},
+    'flaky': {'vector': True, 'cache': False, 'failure_rate': 0.2, 'description': "20% vector failures, retries + breaker"},
+    'cached': {'vector': True, 'cache': True, 'warm': True, 'description': "warm response cache"},
+    'mixed': {'vector': True, 'cache': True, 'failure_rate': 0.01, 'description': "realistic: cold cache, 1% failures"},
+}
+
+def build_query_mix(count: int, seed: int) -> List[str]:
+    """Seeded weighted sample of head queries plus unique long-tail questions"""
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in QUERY_MIX]
+    head = [query for _, query in QUERY_MIX]
+    queries = []
+    for i in range(count):
+        if rng.random() < TAIL_FRACTION:
+            template = rng.choice(TAIL_TEMPLATES)
+            queries.append(f"{template.format(topic=rng.choice(TAIL_TOPICS))} (#{i})")
+        else:
+            queries.append(rng.choices(head, weights)[0])
+    return queries
+
+class InProcessRequest(index.handler):
+    """Drives index.handler without sockets so only handler + pipeline time is measured"""
+
+    def __init__(self, query: str):
+        body = json.dumps({'query': query}).encode('utf-8')
+        self.path = '/api/query'
+        self.headers = {'Content-Length': str(len(body))}
+        self.rfile = io.BytesIO(body)
+        self.wfile = io.BytesIO()
+        self.request_version = 'HTTP/1.1'
+        self.status = None
+
+    def send_response(self, code, message=None):
+        self.status = code
+
+    def send_header(self, keyword, value):
+        pass
+
+    def end_headers(self):
+        pass
+
+def http_request(query: str) -> None:
+    request = InProcessRequest(query)
+    request.do_POST()
+    if request.status != 200:
+        raise RuntimeError(f"HTTP {request.status}")
+
+TARGETS: Dict[str, Callable[[str], Any]] = {
+    'mcp': retrieval.mcp_answer_query,
+    'http': http_request,
+}
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    rank = min(len(sorted_samples) - 1, max(0, int(fraction * len(sorted_samples) + 0.5) - 1))
+    return sorted_samples[rank]
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_scenario(name: str, target: str, requests: int, concurrency: int, latency: float,
+                 jitter: float, seed: int, trace_memory: bool) -> Dict[str, Any]:
+    config = SCENARIOS[name]
+    fake = FakeIndex(latency=latency, jitter=jitter, failure_rate=config.get('failure_rate', 0.0), seed=seed)
+    fake.upsert([chunk_to_vector(chunk) for chunk in build_chunks(retrieval.load_digital_twin_data())])
+    retrieval.set_vector_index(ResilientIndex(fake, CircuitBreaker()) if config['vector'] else None)
+
+    # A zero-size cache misses every time, isolating the uncached pipeline
+    original_cache = retrieval.response_cache
+    retrieval.response_cache = SemanticQueryCache(
+        maxsize=original_cache.cache.maxsize if config['cache'] else 0,
+        ttl=original_cache.cache.ttl,
+        similarity_threshold=original_cache.similarity_threshold
+    )
+
+    call = TARGETS[target]
+    queries = build_query_mix(requests, seed)
+    if config.get('warm'):
+        for query in dict.fromkeys(queries):
+            call(query)
+    hits_before = retrieval.CACHE_LOOKUPS.value(result='hit')
+    misses_before = retrieval.CACHE_LOOKUPS.value(result='miss')
+    vector_calls_before = fake.query_calls
+
+    def timed_call(query: str) -> float:
+        started = time.perf_counter()
+        call(query)
+        return time.perf_counter() - started
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(timed_call, queries))
+        else:
+            latencies = [timed_call(query) for query in queries]
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        retrieval.response_cache = original_cache
+        retrieval.set_vector_index(None)
+
+    hits = retrieval.CACHE_LOOKUPS.value(result='hit') - hits_before
+    lookups = hits + retrieval.CACHE_LOOKUPS.value(result='miss') - misses_before
+    latencies.sort()
+    return {
+        'scenario': name,
+        'target': target,
+        'requests': requests,
+        'concurrency': concurrency,
+        'throughput_qps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'cache_hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+        'vector_queries': fake.query_calls - vector_calls_before,
+        'injected_failures': fake.failed_calls,
+        'traced_peak_mb': round(traced_peak / (1024 * 1024), 2) if traced_peak is not None else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     max_regression: float) -> List[str]:
+    """p95 latency or throughput worse than the baseline by more than max_regression"""
+    previous = {(run['scenario'], run['target']): run for run in baseline}
+    regressions = []
+    for run in results:
+        before = previous.get((run['scenario'], run['target']))
+        if before is None:
+            continue
+        if run['p95_ms'] > before['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{run['scenario']}/{run['target']}: p95 {before['p95_ms']}ms -> {run['p95_ms']}ms")
+        if run['throughput_qps'] < before['throughput_qps'] * (1 - max_regression):
+            regressions.append(f"{run['scenario']}/{run['target']}: throughput "
+                               f"{before['throughput_qps']} -> {run['throughput_qps']} qps")
+    return regressions
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':10} {'target':6} {'qps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'hit':>6} {'vq':>6} {'rss':>8}")
+    for run in results:
+        print(f"{run['scenario']:10} {run['target']:6} {run['throughput_qps']:>9.1f} "
+              f"{run['p50_ms']:>7.2f}ms {run['p95_ms']:>7.2f}ms {run['p99_ms']:>7.2f}ms "
+              f"{run['cache_hit_rate']:>6.1%} {run['vector_queries']:>6} {run['peak_rss_mb'] or 0:>6.1f}MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the query pipeline against a fake vector index")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--target', choices=['mcp', 'http', 'both'], default='both', help="Entry point to drive")
+    parser.add_argument('--requests', type=int, default=300, help="Queries per scenario")
+    parser.add_argument('--concurrency', type=int, default=1, help="Client threads")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Injected vector round-trip latency")
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the query mix and injected faults")
+    parser.add_argument('--trace-memory', action='store_true', help="Report tracemalloc peak (slows the run)")
+    parser.add_argument('--json', action='store_true', help="Print raw JSON instead of a table")
+    parser.add_argument('--save', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against a saved results file and exit 1 on regression")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="Allowed relative p95/throughput regression")
+    args = parser.parse_args()
+
+    targets = ['mcp', 'http'] if args.target == 'both' else [args.target]
+    results = [
+        run_scenario(name, target, args.requests, args.concurrency, args.latency_ms / 1000,
+                     args.jitter_ms / 1000, args.seed, args.trace_memory)
+        for name in args.scenarios.split(',') for target in targets
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        sys.exit(1 if regressions else 0)
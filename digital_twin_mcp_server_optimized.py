@@ -2,400 +2,1208 @@
 """
 Optimized Digital Twin MCP Server
 Uses Upstash Vector's automatic text vectorization for semantic search
+(or the offline local vector index with RETRIEVER_BACKEND=local)
 """
 
-import json
 import os
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
-from functools import lru_cache
+from typing import List, Dict, Any, Iterator, NamedTuple, Optional, Tuple
+from functools import partial, wraps
 from dotenv import load_dotenv
-from upstash_vector import Index
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from analytics import analytics_stats, record_chat
+from health import HealthMonitor, LatencyWindow
+
+from index_artifact import TwinArtifact, load_artifact
+from lexical_index import BM25Index
+from logging_setup import configure_logging, log_fields
+from metrics import registry, timed
+from qa_lookup import QAAnswerTable
+from query_intent import QueryIntent, classify_query
+from rank_fusion import reciprocal_rank_fusion
+from response_cache import SemanticQueryCache
+from singleflight import SingleFlight
+from twin_chunks import ChunkRecord, build_chunks, chunk_search_text, key_achievement_line, qa_answer
+from twin_registry import DEFAULT_TWIN_ID, TwinProfile, TwinRegistry, current_twin_id, use_twin
+from vector_client import CircuitBreaker, CircuitOpenError, NamespacedIndex, create_http_client, create_upstash_index
+
+# Logging is configured by the entry point (index.py, server.py or __main__ below)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
+# Load environment variables (the module-level settings below read them)
 load_dotenv()
 
-# Initialize Upstash Vector clients
-try:
-    # Primary client for read/write operations
-    index = Index(
-        url=os.getenv("UPSTASH_VECTOR_REST_URL"),
-        token=os.getenv("UPSTASH_VECTOR_REST_TOKEN")
-    )
-    
-    # Read-only client for query operations (optional security enhancement)
-    index_readonly = Index(
-        url=os.getenv("UPSTASH_VECTOR_REST_URL"),
-        token=os.getenv("UPSTASH_VECTOR_REST_READONLY_TOKEN")
-    ) if os.getenv("UPSTASH_VECTOR_REST_READONLY_TOKEN") else index
-    
-    logger.info("✅ Upstash Vector clients initialized successfully")
-except Exception as e:
-    logger.error(f"❌ Failed to initialize Upstash Vector clients: {str(e)}")
-    # Continue with fallback to local data only
-    index = None
-    index_readonly = None
+# Twin data and its prebuilt index artifact (resolved relative to this file, not the CWD)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.getenv("DIGITAL_TWIN_DATA", os.path.join(BASE_DIR, 'mytwin_refined.json'))
+ARTIFACT_DIR = os.getenv("DIGITAL_TWIN_ARTIFACT_DIR", os.path.join(BASE_DIR, '.twin_index'))
+# Further twins served from this process, one <twin_id>.json each (see twin_registry.py)
+TWIN_DATA_DIR = os.getenv("DIGITAL_TWIN_DATA_DIR", os.path.join(BASE_DIR, 'twins'))
+
+# Retriever backend: 'upstash' (default) or 'local' for the offline NumPy index
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "upstash").lower()
+
+# Vector clients are created on first use (get_vector_index), not at import,
+# so cold starts that never search do not pay for httpx/NumPy or client setup
+_vector_lock = threading.Lock()
+_vector_state: Dict[str, Any] = {'initialized': False, 'index': None, 'index_readonly': None}
+
+def create_vector_clients() -> Tuple[Optional[Any], Optional[Any]]:
+    """Build the (read/write, read-only) clients for RETRIEVER_BACKEND; Nones when unavailable"""
+    if RETRIEVER_BACKEND == 'local':
+        try:
+            from local_vector import LocalVectorIndex
+            
+            # Same query() surface as Index; the matrix is built on first query
+            index_readonly = LocalVectorIndex(get_twin_chunks, get_artifact_vectors)
+            logger.info("✅ Local vector index configured (offline mode)")
+            return None, index_readonly
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize local vector index: {str(e)}")
+            return None, None
+    
+    # Initialize Upstash Vector clients
+    # Both share one keep-alive HTTP pool and one circuit breaker; calls are wrapped with
+    # short timeouts and jittered retries, and fail fast to local search while the breaker is open
+    try:
+        vector_http_client = create_http_client()
+        vector_breaker = CircuitBreaker()
+        
+        # Primary client for read/write operations
+        index = create_upstash_index(
+            url=os.getenv("UPSTASH_VECTOR_REST_URL"),
+            token=os.getenv("UPSTASH_VECTOR_REST_TOKEN"),
+            http_client=vector_http_client,
+            breaker=vector_breaker
+        )
+        
+        # Read-only client for query operations (optional security enhancement)
+        index_readonly = create_upstash_index(
+            url=os.getenv("UPSTASH_VECTOR_REST_URL"),
+            token=os.getenv("UPSTASH_VECTOR_REST_READONLY_TOKEN"),
+            http_client=vector_http_client,
+            breaker=vector_breaker
+        ) if os.getenv("UPSTASH_VECTOR_REST_READONLY_TOKEN") else index
+        
+        logger.info("✅ Upstash Vector clients initialized successfully")
+        return index, index_readonly
+    except Exception as e:
+        logger.error(f"❌ Failed to initialize Upstash Vector clients: {str(e)}")
+        # Continue with fallback to local data only
+        return None, None
+
+def get_vector_index() -> Optional[Any]:
+    """
+    Read-only vector client for the current twin, created on first call; None when vector search is unavailable
+    Other twins get a view of the same clients (pool, breaker) scoped to their own namespace
+    """
+    if not _vector_state['initialized']:
+        with _vector_lock:
+            if not _vector_state['initialized']:
+                _vector_state['index'], _vector_state['index_readonly'] = create_vector_clients()
+                _vector_state['initialized'] = True
+    index_readonly = _vector_state['index_readonly']
+    twin_id = current_twin_id()
+    if index_readonly is None or twin_id == DEFAULT_TWIN_ID:
+        return index_readonly
+    return twin_registry.get(twin_id).derived('vector_index', build_twin_vector_index)
+
+def build_twin_vector_index(profile: TwinProfile) -> Any:
+    """A non-default twin's vector index: its own offline index, or its Upstash namespace"""
+    shared = _vector_state['index_readonly']
+    if RETRIEVER_BACKEND == 'local' and hasattr(shared, 'reset'):
+        from local_vector import LocalVectorIndex
+        
+        # The offline matrix is built from one twin's chunks, so it cannot be shared
+        return LocalVectorIndex(partial(build_twin_chunks_for, profile), partial(artifact_vectors_for, profile))
+    return NamespacedIndex(shared, profile.twin_id)
+
+def get_write_index() -> Optional[Any]:
+    """Read/write vector client, created on first call"""
+    get_vector_index()
+    return _vector_state['index']
+
+def set_vector_index(index_readonly: Optional[Any], index: Optional[Any] = None) -> None:
+    """Replace the vector clients (e.g. with a FakeIndex for benchmarks); skips lazy creation"""
+    with _vector_lock:
+        _vector_state.update(initialized=True, index=index, index_readonly=index_readonly)
 
 # Configuration
 SIMILARITY_THRESHOLD = 0.3  # Further lowered threshold for better results
 MAX_RESULTS = 5
 CACHE_SIZE = 128
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+CACHE_SIMILARITY_THRESHOLD = float(os.getenv("CACHE_SIMILARITY_THRESHOLD", "0.8"))  # 1.0 disables near-duplicate hits
+DATA_RELOAD_CHECK_SECONDS = 2.0  # How often to stat the twin JSON for edits
+
+# Formatted answers keyed by normalized query; degraded answers are never stored
+response_cache = SemanticQueryCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL_SECONDS,
+                                    similarity_threshold=CACHE_SIMILARITY_THRESHOLD)
+
+# Concurrent identical queries share one in-flight computation instead of each hitting Upstash
+COALESCE_QUERIES = os.getenv("COALESCE_QUERIES", "true").lower() != "false"
+answer_flight = SingleFlight()
+vector_flight = SingleFlight()
+
+# Parallel search configuration
+PARALLEL_SEARCH = os.getenv("PARALLEL_SEARCH", "true").lower() != "false"
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "3.0"))
+# Sized from the HTTP server's request concurrency (server.py MAX_WORKERS) so every running request can fan out
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", os.getenv("MAX_WORKERS", "256")))
+
+# Shared pool for fanning out sub-searches; threads are only spawned on first use
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="twin-search")
+
+# Bulk (multi-question) answering configuration
+BULK_QUERY_GROUP_SIZE = 16  # Questions per bulk vector request
+# Pool workers one batch call may occupy; its further groups wait for them instead of starving single queries
+BULK_MAX_SEARCH_WORKERS = int(os.getenv("BULK_MAX_SEARCH_WORKERS", "4"))
+
+# Batched retrieval configuration
+BATCHED_RETRIEVAL = os.getenv("BATCHED_RETRIEVAL", "true").lower() != "false"
+BATCH_CANDIDATE_MULTIPLIER = 3  # Over-fetch so every type survives the local split
+MAX_BATCH_CANDIDATES = 50
+
+# Hybrid retrieval: fuse vector and BM25 rankings with reciprocal-rank fusion.
+# The lexical side runs while the vector call is in flight; a vector call that misses
+# the budget is dropped and the section is answered from the lexical ranking alone
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() != "false"
+HYBRID_VECTOR_BUDGET_SECONDS = float(os.getenv("HYBRID_VECTOR_BUDGET_SECONDS", "1.5"))
+HYBRID_LEXICAL_DEPTH = 2  # Lexical candidates per wanted result fed into the fusion
+FUSED_SECTIONS = ('experiences', 'skills', 'qa')
+
+# Per-section vector metadata type and number of results wanted
+SECTION_TYPES = {
+    'experiences': ('professional_experience', 3),
+    'skills': ('core_competency', 5),
+    'qa': ('interview_qa', 3),
+    'personal_info': ('personal_info', 1),
+}
+
+# Query planning: a question with a recognized topical intent runs only that topic's
+# sections, fetching just what the formatter shows (2 experiences, 3 skills, 1 answer).
+# Anything else, including a question whose intent keywords are under QUERY_PLAN_MIN_COVERAGE
+# of its content words (a weak match), runs every content section at its SECTION_TYPES depth;
+# personal-info intent adds the profile section on top of either
+QUERY_PLANNING = os.getenv("QUERY_PLANNING", "true").lower() != "false"
+QUERY_PLAN_MIN_COVERAGE = float(os.getenv("QUERY_PLAN_MIN_COVERAGE", "0.5"))
+INTENT_SECTIONS = {
+    'experience': {'experiences': 2},
+    'achievement': {'experiences': 2},
+    'skills': {'skills': 3},
+    'behavioural': {'qa': 1},
+}
+DEFAULT_SECTIONS = ('experiences', 'skills', 'qa')
+
+class QueryPlan(NamedTuple):
+    intent: QueryIntent
+    sections: Dict[str, int]  # section -> top_k, in SECTION_TYPES order
+
+# Health reporting: dependency status is probed in the background, latency comes from real traffic
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "30"))
+query_latency = LatencyWindow()
+vector_latency = LatencyWindow()
+
+# Curated interview_qa questions answered straight from a precompiled table (no retrieval)
+QA_TABLE_ENABLED = os.getenv("QA_TABLE_ENABLED", "true").lower() != "false"
+QA_MATCH_THRESHOLD = float(os.getenv("QA_MATCH_THRESHOLD", "0.6"))  # Trigram Jaccard for near-matches
+
+# Per-stage instrumentation, served in Prometheus text format at /metrics
+STAGE_SECONDS = registry.histogram('twin_stage_duration_seconds', 'Time spent per pipeline stage', ['stage'])
+SEARCH_RESULTS = registry.histogram('twin_search_results', 'Results returned per search section', ['section'],
+                                    buckets=(0, 1, 2, 3, 5, 10))
+VECTOR_QUERIES = registry.counter('twin_vector_queries_total', 'Vector DB calls by outcome', ['outcome'])
+FALLBACKS = registry.counter('twin_local_fallbacks_total', 'Sections answered by local search instead of vector results', ['section'])
+CACHE_LOOKUPS = registry.counter('twin_cache_lookups_total', 'Response cache lookups by result', ['result'])
+QA_TABLE_LOOKUPS = registry.counter('twin_qa_table_lookups_total', 'Q&A answer table lookups by match kind', ['result'])
+COALESCED_CALLS = registry.counter('twin_coalesced_calls_total', 'Calls answered by an identical in-flight call', ['flight'])
+
+# Response cache sizing, read from the cache's own counters on each scrape
+registry.sampled('twin_response_cache_entries', 'Entries held by the response cache', lambda: response_cache.cache.stats()['size'])
+registry.sampled('twin_response_cache_capacity', 'Maximum entries of the response cache (CACHE_SIZE)', lambda: response_cache.cache.maxsize)
+registry.sampled('twin_response_cache_evictions_total', 'Response cache entries evicted for capacity',
+                 lambda: response_cache.cache.stats()['evictions'], 'counter')
+registry.sampled('twin_response_cache_expirations_total', 'Response cache entries dropped after CACHE_TTL_SECONDS',
+                 lambda: response_cache.cache.stats()['expirations'], 'counter')
+registry.sampled('twin_response_cache_invalidations_total', 'Response cache entries dropped by reloads and ingests',
+                 lambda: response_cache.cache.stats()['invalidations'], 'counter')
 
-@lru_cache(maxsize=CACHE_SIZE)
 def load_digital_twin_data(section: Optional[str] = None) -> Dict:
-    """Load data from the digital twin JSON with caching"""
+    """Load the current twin's data, reloading when the file changes"""
     try:
-        with open('mytwin_refined.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if section:
-                return data.get(section, {})
-            return data
+        data = current_profile().data()
+        if section:
+            return data.get(section, {})
+        return data
     except Exception as e:
         logger.error(f"Error loading digital twin data: {str(e)}")
         return {}
 
+def invalidate_twin_caches(profile: Optional[TwinProfile] = None) -> None:
+    """Drop everything derived from a twin's data (default: the current twin) so it is rebuilt on next use"""
+    profile = profile or current_profile()
+    profile.invalidate()
+    if profile.twin_id == DEFAULT_TWIN_ID:
+        vector_index = _vector_state['index_readonly']
+        if hasattr(vector_index, 'reset'):
+            vector_index.reset()
+    response_cache.invalidate(lambda variant: variant_twin_id(variant) == profile.twin_id)
+
+# Every twin's data and derived indexes; the default twin is DATA_FILE and is never evicted
+twin_registry = TwinRegistry(
+    TWIN_DATA_DIR,
+    TwinProfile(DEFAULT_TWIN_ID, DATA_FILE, ARTIFACT_DIR, on_change=invalidate_twin_caches,
+                reload_check_seconds=DATA_RELOAD_CHECK_SECONDS),
+    on_change=invalidate_twin_caches
+)
+
+def current_profile() -> TwinProfile:
+    """Profile of the twin this request is for (see twin_registry.use_twin)"""
+    return twin_registry.get(current_twin_id())
+
+def get_index_artifact() -> Optional[TwinArtifact]:
+    """Open the persisted index artifact if it matches the current twin's data"""
+    return current_profile().derived('artifact', load_twin_artifact)
+
+def load_twin_artifact(profile: TwinProfile) -> Optional[TwinArtifact]:
+    return load_artifact(profile.data_file, profile.artifact_dir) if profile.artifact_dir else None
+
+def get_artifact_vectors() -> Optional[Tuple[Any, Any]]:
+    """Prebuilt (matrix, idf) for the local vector index, if the artifact has them"""
+    return artifact_vectors_for(current_profile())
+
+def artifact_vectors_for(profile: TwinProfile) -> Optional[Tuple[Any, Any]]:
+    artifact = profile.derived('artifact', load_twin_artifact)
+    if artifact is None or artifact.vectors is None:
+        return None
+    return artifact.vectors, artifact.idf
+
+def get_twin_chunks() -> List[Dict[str, Any]]:
+    """Chunk the current twin's data once per load; shared by all local search paths"""
+    return build_twin_chunks_for(current_profile())
+
+def build_twin_chunks_for(profile: TwinProfile) -> List[Dict[str, Any]]:
+    return profile.derived('chunks', build_twin_chunks)
+
+def build_twin_chunks(profile: TwinProfile) -> List[Dict[str, Any]]:
+    artifact = profile.derived('artifact', load_twin_artifact)
+    if artifact is not None:
+        return artifact.chunks
+    return build_chunks(profile.data())
+
+def get_chunk_records() -> List[ChunkRecord]:
+    """Display-ready records for the current twin's chunks (same order as get_twin_chunks)"""
+    return current_profile().derived('records', build_chunk_records)
+
+def build_chunk_records(profile: TwinProfile) -> List[ChunkRecord]:
+    return [chunk_record(chunk['id'], chunk, 0.0) for chunk in build_twin_chunks_for(profile)]
+
+def get_records_by_id() -> Dict[str, ChunkRecord]:
+    return current_profile().derived('records_by_id', build_records_by_id)
+
+def build_records_by_id(profile: TwinProfile) -> Dict[str, ChunkRecord]:
+    return {record.id: record for record in profile.derived('records', build_chunk_records)}
+
+def experience_line(metadata: Dict[str, Any], content: str) -> str:
+    if not content:
+        return ''
+    # Chunks ingested before key_achievement was stored still get one
+    key_achievement = metadata['key_achievement'] if 'key_achievement' in metadata else key_achievement_line(content)
+    company = metadata.get('company', 'Unknown')
+    position = metadata.get('position', 'Unknown')
+    if key_achievement:
+        return f"At {company} as {position}: {key_achievement}"
+    return f"At {company}, I worked as {position}."
+
+def skill_line(metadata: Dict[str, Any], content: str) -> str:
+    skill_name = metadata.get('skill_name', 'Unknown')
+    return f"{skill_name}: {content}" if skill_name and content else ''
+
+def qa_line(metadata: Dict[str, Any], content: str) -> str:
+    return metadata['answer'] if 'answer' in metadata else qa_answer(content)
+
+# Chunk type -> builder of the line a response shows for it
+DISPLAY_LINES = {
+    'professional_experience': experience_line,
+    'core_competency': skill_line,
+    'interview_qa': qa_line,
+}
+
+def chunk_record(chunk_id: str, metadata: Dict[str, Any], score: float) -> ChunkRecord:
+    """Record for a chunk or vector hit, with its display line built once"""
+    chunk_type = metadata.get('type', 'unknown')
+    display_line = DISPLAY_LINES.get(chunk_type)
+    display = display_line(metadata, metadata.get('content', metadata.get('description', ''))) if display_line else ''
+    return ChunkRecord(chunk_id, chunk_type, score, display, metadata)
+
+def get_lexical_index() -> BM25Index:
+    """The current twin's BM25 inverted index, built once per data load"""
+    return current_profile().derived('lexical_index', build_lexical_index)
+
+def build_lexical_index(profile: TwinProfile) -> BM25Index:
+    artifact = profile.derived('artifact', load_twin_artifact)
+    if artifact is not None:
+        return artifact.lexical_index
+    
+    chunks = build_twin_chunks_for(profile)
+    index_build = BM25Index.build((chunk['id'], chunk['type'], chunk_search_text(chunk)) for chunk in chunks)
+    logger.info(f"✅ Lexical index built over {len(chunks)} chunks ({len(index_build.postings)} terms)")
+    return index_build
+
+def get_qa_table() -> QAAnswerTable:
+    """The current twin's interview_qa lookup table, compiled once per data load"""
+    return current_profile().derived('qa_table', build_qa_table)
+
+def build_qa_table(profile: TwinProfile) -> QAAnswerTable:
+    table = QAAnswerTable.build(build_twin_chunks_for(profile), similarity_threshold=QA_MATCH_THRESHOLD)
+    logger.info(f"✅ Q&A answer table built over {len(table)} questions")
+    return table
+
+def lookup_qa_answer(query: str) -> Optional[str]:
+    """Ready-made answer when the query is (nearly) one of the curated interview questions"""
+    if not QA_TABLE_ENABLED:
+        return None
+    match = get_qa_table().lookup(query)
+    QA_TABLE_LOOKUPS.inc(result=match.match if match else 'miss')
+    return match.answer.answer if match else None
+
+def local_chunk_search(query: str, chunk_type: str, top_k: int) -> List[ChunkRecord]:
+    """BM25 search over the local twin chunks of one type, best first"""
+    records = get_chunk_records()
+    return [records[doc_idx]._replace(score=score)
+            for score, doc_idx in get_lexical_index().search(query, top_k, doc_type=chunk_type)]
+
+def instrumented_search(section: str):
+    """Time a search_* function and record how many results it returned"""
+    def decorate(search_fn):
+        @wraps(search_fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with STAGE_SECONDS.time(stage=f'search_{section}'):
+                results = search_fn(*args, **kwargs)
+            SEARCH_RESULTS.observe(len(results) if isinstance(results, list) else int(bool(results)), section=section)
+            return results
+        return wrapper
+    return decorate
+
 def safe_vector_query(query_text: str, top_k: int = MAX_RESULTS, 
-                     filter_type: Optional[str] = None) -> List[Dict[str, Any]]:
+                     filter_type: Optional[str] = None) -> List[ChunkRecord]:
     """
     Safely query Upstash Vector with automatic text embedding
     Uses raw text query - Upstash handles the embedding automatically
     """
+    return vector_query_or_none(query_text, top_k, filter_type) or []
+
+def vector_query_or_none(query_text: str, top_k: int = MAX_RESULTS,
+                         filter_type: Optional[str] = None) -> Optional[List[ChunkRecord]]:
+    """
+    Query the vector index, returning None (rather than []) when it is unavailable or fails
+    Lets callers tell an outage apart from a query with no relevant matches
+    Identical concurrent queries share one round trip.
+    """
+    return coalesce(vector_flight, 'vector', (current_twin_id(), query_text, top_k, filter_type),
+                    _vector_query_or_none, query_text, top_k, filter_type)
+
+def _vector_query_or_none(query_text: str, top_k: int,
+                          filter_type: Optional[str]) -> Optional[List[ChunkRecord]]:
+    index_readonly = get_vector_index()
     if not index_readonly:
-        logger.warning("Vector database not available, falling back to local search")
-        return []
+        VECTOR_QUERIES.inc(outcome='unavailable')
+        logger.warning("Vector database not available, falling back to local search",
+                       extra=log_fields('vector_unavailable', sampled=True))
+        return None
+    
+    # The type filter runs after retrieval, so over-fetch to keep top_k results of that type
+    fetch_k = min(top_k * BATCH_CANDIDATE_MULTIPLIER, MAX_BATCH_CANDIDATES) if filter_type else top_k
     
     try:
         # Query with raw text - Upstash handles embedding automatically
         # Note: Removed filter for now due to API format issues
-        response = index_readonly.query(
+        response = timed_vector_call(
+            index_readonly.query,
             data=query_text,  # Raw text query
-            top_k=top_k,
+            top_k=fetch_k,
             include_metadata=True
         )
         
-        # Process results - handle Upstash Vector response format
-        results = []
-        matches = response if isinstance(response, list) else []
-            
-        for match in matches:
-            # Handle QueryResult objects from Upstash Vector
-            score = match.score if hasattr(match, 'score') else 0.0
-            match_id = match.id if hasattr(match, 'id') else ''
-            metadata = match.metadata if hasattr(match, 'metadata') else {}
-                
-            if score >= SIMILARITY_THRESHOLD:
-                # Apply filter after retrieval if specified
-                if filter_type and metadata.get('type') != filter_type:
-                    continue
-                    
-                result = {
-                    'id': match_id,
-                    'score': score,
-                    'metadata': metadata,
-                    'content': metadata.get('content', metadata.get('description', '')),
-                    'type': metadata.get('type', 'unknown')
-                }
-                results.append(result)
-        
-        logger.info(f"✅ Vector query returned {len(results)} relevant results")
+        results = process_vector_matches(response, filter_type)[:top_k]
+        # Per-query hot path: lazy %-formatting, and only a sample of successes is logged
+        logger.info("✅ Vector query returned %d relevant results", len(results),
+                    extra=log_fields('vector_query', sampled=True, results=len(results)))
         return results
         
     except Exception as e:
-        logger.error(f"❌ Vector query failed: {str(e)}")
-        if "authentication" in str(e).lower():
-            logger.error("Check UPSTASH_VECTOR_REST_TOKEN in .env file")
-        elif "quota" in str(e).lower():
-            logger.error("Query quota exceeded - check your Upstash plan")
-        return []
+        log_vector_query_error(e)
+        return None
+
+def coalesce(flight: SingleFlight, name: str, key: Any, fn: Any, *args: Any) -> Any:
+    """Run fn(*args) through the single-flight group, counting callers that shared another's result"""
+    if not COALESCE_QUERIES:
+        return fn(*args)
+    result, shared = flight.do(key, fn, *args)
+    if shared:
+        COALESCED_CALLS.inc(flight=name)
+    return result
 
-def get_relevant_experiences(query: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get relevant professional experiences using vector search"""
+def timed_vector_call(method: Any, **kwargs: Any) -> Any:
+    """Call a vector index method, recording successful round-trip latency for health and metrics"""
+    with STAGE_SECONDS.time(stage='vector_query'):
+        started = time.perf_counter()
+        response = method(**kwargs)
+        vector_latency.record(time.perf_counter() - started)
+    VECTOR_QUERIES.inc(outcome='ok')
+    return response
+
+def process_vector_matches(response: Any, filter_type: Optional[str] = None) -> List[ChunkRecord]:
+    """Convert raw vector matches into chunk records, applying threshold and type filter"""
+    # Process results - handle Upstash Vector response format
+    results = []
+    matches = response if isinstance(response, list) else []
+    records_by_id = get_records_by_id()
+        
+    for match in matches:
+        # Handle QueryResult objects from Upstash Vector
+        score = match.score if hasattr(match, 'score') else 0.0
+        match_id = match.id if hasattr(match, 'id') else ''
+        metadata = match.metadata if hasattr(match, 'metadata') else {}
+        metadata = metadata or {}
+            
+        if score >= SIMILARITY_THRESHOLD:
+            # Apply filter after retrieval if specified
+            if filter_type and metadata.get('type') != filter_type:
+                continue
+            
+            # The local index hands back our own chunk dicts, whose records are already built
+            record = records_by_id.get(match_id)
+            if record is not None and record.metadata is metadata:
+                results.append(record._replace(score=score))
+            else:
+                results.append(chunk_record(match_id, metadata, score))
     
-    # First try vector search
-    vector_results = safe_vector_query(query, top_k=3, filter_type='professional_experience')
+    return results
+
+def log_vector_query_error(e: Exception) -> None:
+    """Log a failed vector query with a hint for common configuration problems"""
+    VECTOR_QUERIES.inc(outcome='circuit_open' if isinstance(e, CircuitOpenError) else 'error')
+    if isinstance(e, CircuitOpenError):
+        logger.debug("Vector DB circuit breaker open, using local search")
+        return
+    logger.error("❌ Vector query failed: %s", e, extra=log_fields('vector_query_failed', error=type(e).__name__))
+    if "authentication" in str(e).lower():
+        logger.error("Check UPSTASH_VECTOR_REST_TOKEN in .env file")
+    elif "quota" in str(e).lower():
+        logger.error("Query quota exceeded - check your Upstash plan")
+
+def multi_type_vector_query(query_text: str,
+                            type_top_k: Dict[str, int]) -> Optional[Dict[str, List[ChunkRecord]]]:
+    """
+    Fetch candidates for several metadata types in a single vector round trip
+    Over-fetches once and splits the results by metadata['type'] locally.
+    Works against any index exposing query(data=, top_k=, include_metadata=).
+    Returns None when vector search is unavailable or the query fails.
+    Identical concurrent queries share one round trip.
+    """
+    return coalesce(vector_flight, 'vector', (current_twin_id(), query_text, tuple(sorted(type_top_k.items()))),
+                    _multi_type_vector_query, query_text, type_top_k)
+
+def _multi_type_vector_query(query_text: str,
+                             type_top_k: Dict[str, int]) -> Optional[Dict[str, List[ChunkRecord]]]:
+    index_readonly = get_vector_index()
+    if not index_readonly:
+        VECTOR_QUERIES.inc(outcome='unavailable')
+        logger.warning("Vector database not available, falling back to local search",
+                       extra=log_fields('vector_unavailable', sampled=True))
+        return None
     
-    if vector_results:
-        experiences = []
-        for result in vector_results:
-            metadata = result.get('metadata', {})
-            experience = {
-                'company': metadata.get('company', 'Unknown'),
-                'position': metadata.get('position', 'Unknown'),
-                'duration': metadata.get('duration', 'Unknown'),
-                'content': result.get('content', ''),
-                'relevance_score': result.get('score', 0.0),
-                'type': 'experience'
-            }
-            experiences.append(experience)
-        return experiences
-    
-    # Fallback to local data if vector search fails
-    logger.info("Falling back to local experience search")
-    data = load_digital_twin_data()
-    experiences = data.get('professional_experience', [])
+    try:
+        response = timed_vector_call(
+            index_readonly.query,
+            data=query_text,
+            top_k=batch_candidate_count(type_top_k),
+            include_metadata=True
+        )
+    except Exception as e:
+        log_vector_query_error(e)
+        return None
     
-    # Simple keyword matching for fallback
-    query_lower = query.lower()
-    relevant = []
+    by_type = split_matches_by_type(response, type_top_k)
+    if logger.isEnabledFor(logging.INFO):
+        results = sum(len(v) for v in by_type.values())
+        logger.info("✅ Batched vector query returned %d relevant results", results,
+                    extra=log_fields('batched_vector_query', sampled=True, results=results))
+    return by_type
+
+def batch_candidate_count(type_top_k: Dict[str, int]) -> int:
+    """How many candidates one over-fetching query needs to fill every type"""
+    return min(sum(type_top_k.values()) * BATCH_CANDIDATE_MULTIPLIER, MAX_BATCH_CANDIDATES)
+
+def split_matches_by_type(response: Any, type_top_k: Dict[str, int]) -> Dict[str, List[ChunkRecord]]:
+    """Bucket vector matches by metadata['type'], keeping the best top_k of each"""
+    by_type = {filter_type: [] for filter_type in type_top_k}
+    for result in process_vector_matches(response):
+        bucket = by_type.get(result.type)
+        if bucket is not None and len(bucket) < type_top_k[result.type]:
+            bucket.append(result)
+    return by_type
+
+def multi_type_vector_query_many(query_texts: List[str],
+                                 type_top_ks: List[Dict[str, int]]) -> List[Optional[Dict[str, List[ChunkRecord]]]]:
+    """
+    multi_type_vector_query for many questions in one bulk round trip
+    Uses the index's query_many() when it has one, else one query per question.
+    Each entry is None when vector search is unavailable or failed for that question.
+    """
+    index_readonly = get_vector_index()
+    if not index_readonly:
+        VECTOR_QUERIES.inc(outcome='unavailable')
+        logger.warning("Vector database not available, falling back to local search",
+                       extra=log_fields('vector_unavailable', sampled=True))
+        return [None] * len(query_texts)
     
-    for exp in experiences:
-        relevance = 0
-        text_to_search = f"{exp.get('company', '')} {exp.get('position', '')} {exp.get('description', '')}"
-        
-        # Simple keyword scoring
-        for word in query_lower.split():
-            if word in text_to_search.lower():
-                relevance += 1
-        
-        if relevance > 0:
-            exp_copy = exp.copy()
-            exp_copy['relevance_score'] = relevance / len(query_lower.split())
-            exp_copy['type'] = 'experience'
-            relevant.append(exp_copy)
+    if not hasattr(index_readonly, 'query_many'):
+        return [multi_type_vector_query(query_text, type_top_k)
+                for query_text, type_top_k in zip(query_texts, type_top_ks)]
     
-    # Sort by relevance and return top results
-    relevant.sort(key=lambda x: x['relevance_score'], reverse=True)
-    return relevant[:3]
+    try:
+        responses = timed_vector_call(index_readonly.query_many, queries=[
+            {'data': query_text, 'top_k': batch_candidate_count(type_top_k), 'include_metadata': True}
+            for query_text, type_top_k in zip(query_texts, type_top_ks)
+        ])
+    except Exception as e:
+        log_vector_query_error(e)
+        return [None] * len(query_texts)
+    
+    logger.info("✅ Bulk vector query answered %d questions", len(query_texts),
+                extra=log_fields('bulk_vector_query', sampled=True, questions=len(query_texts)))
+    return [split_matches_by_type(response, type_top_k) for response, type_top_k in zip(responses, type_top_ks)]
 
-def search_skills_and_competencies(query: str) -> List[Dict[str, Any]]:
-    """Search for skills and competencies using vector search"""
+@instrumented_search('experiences')
+def get_relevant_experiences(query: str, category: Optional[str] = None,
+                             vector_results: Optional[List[ChunkRecord]] = None) -> List[ChunkRecord]:
+    """Get relevant professional experiences using vector search (or prefetched vector results)"""
     
-    # Vector search for skills
-    vector_results = safe_vector_query(query, top_k=5, filter_type='core_competency')
+    # First try vector search
+    if vector_results is None:
+        vector_results = safe_vector_query(query, top_k=3, filter_type='professional_experience')
     
     if vector_results:
-        skills = []
-        for result in vector_results:
-            metadata = result.get('metadata', {})
-            skill = {
-                'skill_name': metadata.get('skill_name', 'Unknown'),
-                'description': result.get('content', ''),
-                'relevance_score': result.get('score', 0.0),
-                'type': 'skill'
-            }
-            skills.append(skill)
-        return skills
+        return vector_results
     
-    # Fallback to local skills search
-    logger.info("Falling back to local skills search")
-    data = load_digital_twin_data()
-    personal_info = data.get('personalInfo', {})
-    competencies = personal_info.get('core_competencies', {})
+    # Fallback to local BM25 search if vector search fails
+    FALLBACKS.inc(section='experiences')
+    logger.info("Falling back to local experience search", extra=log_fields('local_fallback', sampled=True, section='experiences'))
+    return local_chunk_search(query, 'professional_experience', 3)
+
+@instrumented_search('skills')
+def search_skills_and_competencies(query: str,
+                                   vector_results: Optional[List[ChunkRecord]] = None) -> List[ChunkRecord]:
+    """Search for skills and competencies using vector search (or prefetched vector results)"""
     
-    query_lower = query.lower()
-    relevant_skills = []
+    # Vector search for skills
+    if vector_results is None:
+        vector_results = safe_vector_query(query, top_k=5, filter_type='core_competency')
     
-    for skill_key, description in competencies.items():
-        skill_name = skill_key.replace('_', ' ').title()
-        relevance = 0
-        
-        # Check skill name and description for matches
-        search_text = f"{skill_name} {description}".lower()
-        for word in query_lower.split():
-            if word in search_text:
-                relevance += 1
-        
-        if relevance > 0:
-            skill = {
-                'skill_name': skill_name,
-                'description': description,
-                'relevance_score': relevance / len(query_lower.split()),
-                'type': 'skill'
-            }
-            relevant_skills.append(skill)
+    if vector_results:
+        return vector_results
     
-    relevant_skills.sort(key=lambda x: x['relevance_score'], reverse=True)
-    return relevant_skills[:5]
+    # Fallback to local skills search
+    FALLBACKS.inc(section='skills')
+    logger.info("Falling back to local skills search", extra=log_fields('local_fallback', sampled=True, section='skills'))
+    return local_chunk_search(query, 'core_competency', 5)
 
-def search_interview_qa(query: str) -> List[Dict[str, Any]]:
-    """Search interview Q&A using vector search"""
+@instrumented_search('qa')
+def search_interview_qa(query: str,
+                        vector_results: Optional[List[ChunkRecord]] = None) -> List[ChunkRecord]:
+    """Search interview Q&A using vector search (or prefetched vector results)"""
     
     # Vector search for Q&A
-    vector_results = safe_vector_query(query, top_k=3, filter_type='interview_qa')
+    if vector_results is None:
+        vector_results = safe_vector_query(query, top_k=3, filter_type='interview_qa')
     
     if vector_results:
-        qa_results = []
-        for result in vector_results:
-            metadata = result.get('metadata', {})
-            qa = {
-                'question': metadata.get('question', 'Unknown'),
-                'answer': result.get('content', '').split('Answer: ')[-1] if 'Answer: ' in result.get('content', '') else result.get('content', ''),
-                'category': metadata.get('category', 'general'),
-                'relevance_score': result.get('score', 0.0),
-                'type': 'qa'
-            }
-            qa_results.append(qa)
-        return qa_results
+        return vector_results
     
     # Fallback to local Q&A search
-    logger.info("Falling back to local Q&A search")
+    FALLBACKS.inc(section='qa')
+    logger.info("Falling back to local Q&A search", extra=log_fields('local_fallback', sampled=True, section='qa'))
     return get_local_qa_fallback(query)
 
-def get_local_qa_fallback(query: str) -> List[Dict[str, Any]]:
-    """Fallback method for Q&A search using local data"""
+def get_local_qa_fallback(query: str) -> List[ChunkRecord]:
+    """Fallback method for Q&A search using the local BM25 index"""
+    return local_chunk_search(query, 'interview_qa', 3)
+
+@instrumented_search('personal_info')
+def search_personal_info(query: str,
+                         vector_results: Optional[List[ChunkRecord]] = None) -> Dict[str, Any]:
+    """Search personal info using vector search, falling back to local data"""
+    if vector_results is None:
+        vector_results = safe_vector_query(query, top_k=1, filter_type='personal_info')
+    # Only use the vector hit if its metadata carries the profile fields the formatter needs
+    if vector_results and vector_results[0].metadata.get('name'):
+        return vector_results[0].metadata
+    
+    # Fallback to local personal info
+    FALLBACKS.inc(section='personal_info')
     data = load_digital_twin_data()
-    interview_qa = data.get('interview_qa', {})
+    return data.get('personalInfo', {})
+
+def run_searches_parallel(searches: Dict[str, Any], query: str,
+                          deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run independent sub-searches concurrently under a shared deadline
+    Sections that miss the deadline are left out so latency is bounded by the slowest query
+    """
+    if deadline is None:
+        deadline = SEARCH_DEADLINE_SECONDS
     
-    query_lower = query.lower()
-    relevant_qa = []
+    # copy_context() carries the active request trace onto the worker threads
+    futures = {search_executor.submit(copy_context().run, search_fn, query): section
+               for section, search_fn in searches.items()}
+    done, not_done = wait(futures, timeout=deadline)
+    
+    results = {}
+    for future in done:
+        section = futures[future]
+        try:
+            results[section] = future.result()
+        except Exception as e:
+            logger.error(f"❌ {section} search failed: {str(e)}")
+    
+    for future in not_done:
+        future.cancel()
+        logger.warning(f"⏱️ {futures[future]} search missed the {deadline}s deadline")
+    
+    return results
+
+SECTION_SEARCHES = {
+    'experiences': get_relevant_experiences,
+    'skills': search_skills_and_competencies,
+    'qa': search_interview_qa,
+    'personal_info': search_personal_info,
+}
+
+def plan_query(query: str) -> QueryPlan:
+    """Sections (and how many results of each) the query's intent needs"""
+    intent = classify_query(query)
+    wanted: Dict[str, int] = {}
+    if QUERY_PLANNING and intent.coverage >= QUERY_PLAN_MIN_COVERAGE:
+        for name in intent.intents:
+            for section, top_k in INTENT_SECTIONS.get(name, {}).items():
+                wanted[section] = max(top_k, wanted.get(section, 0))
+    if not wanted:
+        wanted = {section: SECTION_TYPES[section][1] for section in DEFAULT_SECTIONS}
+    if intent.has('personal'):
+        wanted['personal_info'] = SECTION_TYPES['personal_info'][1]
+    return QueryPlan(intent, {section: wanted[section] for section in SECTION_TYPES if section in wanted})
+
+def section_searches(plan: QueryPlan) -> Dict[str, Any]:
+    """Search function for every section in the plan"""
+    return {section: SECTION_SEARCHES[section] for section in plan.sections}
+
+def plan_type_top_k(plan: QueryPlan) -> Dict[str, int]:
+    """Vector metadata type -> top_k for a batched query covering the plan"""
+    return {SECTION_TYPES[section][0]: top_k for section, top_k in plan.sections.items()}
+
+@timed(STAGE_SECONDS, stage='comprehensive_search')
+def comprehensive_search(query: str, parallel: Optional[bool] = None,
+                         batched: Optional[bool] = None, hybrid: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Perform comprehensive search across all data types
+    Batched mode costs one vector round trip; otherwise sub-searches fan out (in parallel by default).
+    Hybrid mode ranks the lexical index meanwhile and fuses both under HYBRID_VECTOR_BUDGET_SECONDS.
+    Only the sections the query plan needs are searched.
+    """
+    if hybrid is None:
+        hybrid = HYBRID_RETRIEVAL
+    
+    plan = plan_query(query)
+    if not hybrid:
+        return assemble_search_results(query, plan, fetch_vector_results(query, plan, parallel, batched), hybrid=hybrid)
+    
+    # Only leaf tasks go to the pool: a task waiting on further pool work would hold a worker
+    # while its sub-searches queue behind every other request's outer task
+    futures = [search_executor.submit(copy_context().run, task)
+               for task in vector_fetch_tasks(query, plan, parallel, batched)]
+    lexical_results = {section: lexical_candidates(query, section, top_k)
+                       for section, top_k in plan.sections.items() if section in FUSED_SECTIONS}
+    done, not_done = wait(futures, timeout=HYBRID_VECTOR_BUDGET_SECONDS)
+    
+    vector_results: Dict[str, Optional[List[ChunkRecord]]] = {section: None for section in plan.sections}
+    for future in done:
+        try:
+            vector_results.update(future.result())
+        except Exception as e:
+            logger.error(f"❌ Vector search failed: {str(e)}")
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        logger.warning(f"⏱️ Vector search missed the {HYBRID_VECTOR_BUDGET_SECONDS}s hybrid budget, using keyword results")
+    return assemble_search_results(query, plan, vector_results, lexical_results, hybrid=hybrid)
+
+def vector_fetch_tasks(query: str, plan: QueryPlan, parallel: Optional[bool] = None,
+                       batched: Optional[bool] = None) -> List[Any]:
+    """
+    Independent tasks that together return every planned section's vector results
+    (as fetch_vector_results does); none of them submits work of its own
+    """
+    if parallel is None:
+        parallel = PARALLEL_SEARCH
+    if batched is None:
+        batched = BATCHED_RETRIEVAL
+    
+    if batched or not parallel:
+        return [partial(fetch_vector_results, query, plan, parallel=False, batched=batched)]
+    return [
+        partial(section_vector_results, section, query, top_k)
+        for section, top_k in plan.sections.items()
+    ]
+
+def section_vector_results(section: str, query: str, top_k: int) -> Dict[str, Optional[List[ChunkRecord]]]:
+    return {section: vector_query_or_none(query, top_k, SECTION_TYPES[section][0])}
+
+def fetch_vector_results(query: str, plan: QueryPlan, parallel: Optional[bool] = None,
+                         batched: Optional[bool] = None) -> Dict[str, Optional[List[ChunkRecord]]]:
+    """Vector results per section (None for a section whose query failed or timed out)"""
+    if parallel is None:
+        parallel = PARALLEL_SEARCH
+    if batched is None:
+        batched = BATCHED_RETRIEVAL
+    
+    if batched:
+        prefetched = multi_type_vector_query(query, plan_type_top_k(plan))
+        return {
+            section: prefetched.get(SECTION_TYPES[section][0], []) if prefetched is not None else None
+            for section in plan.sections
+        }
+    
+    fetchers = {
+        section: partial(vector_query_or_none, filter_type=SECTION_TYPES[section][0], top_k=top_k)
+        for section, top_k in plan.sections.items()
+    }
+    if parallel:
+        return run_searches_parallel(fetchers, query)
+    return {section: fetch(query) for section, fetch in fetchers.items()}
+
+def lexical_candidates(query: str, section: str, top_k: int) -> List[ChunkRecord]:
+    """BM25 ranking of the section's chunk type, deep enough to feed the fusion"""
+    return local_chunk_search(query, SECTION_TYPES[section][0], top_k * HYBRID_LEXICAL_DEPTH)
+
+def fuse_section_results(section: str, vector_results: Optional[List[ChunkRecord]],
+                         lexical_results: List[ChunkRecord], top_k: int) -> List[ChunkRecord]:
+    """
+    Reciprocal-rank fusion of a section's vector and BM25 rankings by chunk id
+    Returns the top_k records (score = fused RRF score) for the section's search_* function
+    """
+    vector_results = vector_results or []
+    if not vector_results and lexical_results:
+        FALLBACKS.inc(section=section)
+    
+    by_id = {record.id: record for record in lexical_results}
+    # Vector metadata wins for ids both retrievers found
+    for result in vector_results:
+        by_id[result.id] = result
+    
+    fused = reciprocal_rank_fusion([
+        [result.id for result in vector_results],
+        [record.id for record in lexical_results],
+    ])
+    return [by_id[result_id]._replace(score=score) for result_id, score in fused[:top_k]]
+
+def assemble_search_results(query: str, plan: QueryPlan,
+                            vector_results: Dict[str, Optional[List[ChunkRecord]]],
+                            lexical_results: Optional[Dict[str, List[ChunkRecord]]] = None,
+                            hybrid: Optional[bool] = None) -> Dict[str, Any]:
+    """Run each planned section's search over its prefetched (and, in hybrid mode, fused) results and collect the sections"""
+    if hybrid is None:
+        hybrid = HYBRID_RETRIEVAL
+    # A section without vector results (outage or missed deadline) goes straight to its local fallback
+    degraded = any(vector_results.get(section) is None for section in plan.sections)
+    section_results = {
+        section: search_fn(query, vector_results=section_candidates(
+            query, section, vector_results.get(section), plan.sections[section], hybrid,
+            (lexical_results or {}).get(section)))
+        for section, search_fn in section_searches(plan).items()
+    }
     
-    for category, qa_list in interview_qa.items():
-        for qa in qa_list:
-            question = qa.get('question', '')
-            answer = qa.get('answer', '')
-            keywords = qa.get('keywords', [])
-            
-            relevance = 0
-            search_text = f"{question} {answer} {' '.join(keywords)}".lower()
-            
-            for word in query_lower.split():
-                if word in search_text:
-                    relevance += 1
-            
-            if relevance > 0:
-                qa_result = {
-                    'question': question,
-                    'answer': answer,
-                    'category': category,
-                    'relevance_score': relevance / len(query_lower.split()),
-                    'type': 'qa'
-                }
-                relevant_qa.append(qa_result)
-    
-    relevant_qa.sort(key=lambda x: x['relevance_score'], reverse=True)
-    return relevant_qa[:3]
-
-def comprehensive_search(query: str) -> Dict[str, Any]:
-    """Perform comprehensive search across all data types"""
     results = {
-        'experiences': get_relevant_experiences(query),
-        'skills': search_skills_and_competencies(query),
-        'qa': search_interview_qa(query),
+        'experiences': section_results.get('experiences', []),
+        'skills': section_results.get('skills', []),
+        'qa': section_results.get('qa', []),
         'query': query,
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'degraded': degraded
     }
-    
-    # Also search for personal info if query seems relevant
-    if any(word in query.lower() for word in ['name', 'contact', 'location', 'summary', 'about']):
-        vector_results = safe_vector_query(query, top_k=1, filter_type='personal_info')
-        if vector_results:
-            results['personal_info'] = vector_results[0]
-        else:
-            # Fallback to local personal info
-            data = load_digital_twin_data()
-            results['personal_info'] = data.get('personalInfo', {})
+    if 'personal_info' in section_results:
+        results['personal_info'] = section_results['personal_info']
     
     return results
 
-def format_comprehensive_response(results: Dict[str, Any], query: str) -> str:
-    """Format comprehensive search results into a coherent response"""
+def section_candidates(query: str, section: str, vector_results: Optional[List[ChunkRecord]], top_k: int,
+                       hybrid: bool, lexical_results: Optional[List[ChunkRecord]] = None) -> List[ChunkRecord]:
+    """What a section's search_* function gets: fused results in hybrid mode, else the raw vector results"""
+    if not hybrid or section not in FUSED_SECTIONS:
+        return vector_results or []
+    if lexical_results is None:
+        lexical_results = lexical_candidates(query, section, top_k)
+    return fuse_section_results(section, vector_results, lexical_results, top_k)
+
+NO_INFORMATION_RESPONSE = "I don't have specific information about that topic. Could you please ask about my professional experience, skills, or career background?"
+
+def format_personal_section(personal: Any, query: str) -> List[str]:
+    """Response parts for personal info queries"""
+    response_parts = []
+    if personal and isinstance(personal, dict):
+        name = personal.get('name', '')
+        title = personal.get('title', '')
+        summary = personal.get('summary', '')
+        intent = classify_query(query)
+        
+        if intent.has('name'):
+            response_parts.append(f"I'm {name}, {title}.")
+        
+        if intent.has('summary'):
+            response_parts.append(summary)
+    return response_parts
+
+def format_experience_section(experiences: List[ChunkRecord]) -> List[str]:
+    """Response parts for experience results"""
     response_parts = []
-    
-    # Handle personal info queries
-    if 'personal_info' in results and results['personal_info']:
-        personal = results['personal_info']
-        if isinstance(personal, dict):
-            name = personal.get('name', '')
-            title = personal.get('title', '')
-            summary = personal.get('summary', '')
-            
-            if any(word in query.lower() for word in ['name', 'who are you']):
-                response_parts.append(f"I'm {name}, {title}.")
-            
-            if 'summary' in query.lower() or 'about' in query.lower():
-                response_parts.append(summary)
-    
-    # Handle experience results
-    experiences = results.get('experiences', [])
     if experiences:
         response_parts.append("Based on my professional experience:")
-        for exp in experiences[:2]:  # Top 2 most relevant
-            company = exp.get('company', 'Unknown')
-            position = exp.get('position', 'Unknown')
-            content = exp.get('content', '')
-            
-            if content:
-                # Extract key info from content
-                lines = content.split('\n')
-                key_info = [line for line in lines if any(keyword in line.lower() 
-                           for keyword in ['achievement', 'key', 'result', 'improvement'])]
-                
-                if key_info:
-                    response_parts.append(f"At {company} as {position}: {key_info[0]}")
-                else:
-                    response_parts.append(f"At {company}, I worked as {position}.")
-    
-    # Handle skills results  
-    skills = results.get('skills', [])
+        # Top 2 most relevant; each line (key achievement or role) was built with the record
+        response_parts.extend(exp.display for exp in experiences[:2] if exp.display)
+    return response_parts
+
+def format_skills_section(skills: List[ChunkRecord], include_header: bool) -> List[str]:
+    """Response parts for skills results; the header is only used without an experience section"""
+    response_parts = []
     if skills:
-        if not experiences:  # Only add this header if no experience section
+        if include_header:
             response_parts.append("Regarding my skills and competencies:")
-        
-        skill_descriptions = []
-        for skill in skills[:3]:  # Top 3 most relevant
-            skill_name = skill.get('skill_name', '')
-            description = skill.get('description', '')
-            if skill_name and description:
-                skill_descriptions.append(f"{skill_name}: {description}")
-        
-        if skill_descriptions:
-            response_parts.extend(skill_descriptions)
+        response_parts.extend(skill.display for skill in skills[:3] if skill.display)  # Top 3 most relevant
+    return response_parts
+
+def format_qa_section(qa_results: List[ChunkRecord]) -> List[str]:
+    """Response parts for Q&A results (the most relevant answer only)"""
+    if qa_results and qa_results[0].display:
+        return [qa_results[0].display]
+    return []
+
+@timed(STAGE_SECONDS, stage='format_response')
+def format_comprehensive_response(results: Dict[str, Any], query: str) -> str:
+    """Format comprehensive search results into a coherent response"""
+    experiences = results.get('experiences', [])
+    skills = results.get('skills', [])
+    
+    response_parts = format_personal_section(results.get('personal_info'), query)
+    response_parts.extend(format_experience_section(experiences))
+    response_parts.extend(format_skills_section(skills, include_header=not experiences))
     
-    # Handle Q&A results
-    qa_results = results.get('qa', [])
-    if qa_results and not (experiences or skills):  # Only if no other results
-        best_qa = qa_results[0]  # Most relevant Q&A
-        answer = best_qa.get('answer', '')
-        if answer:
-            response_parts.append(answer)
+    # Q&A only if no other results
+    if not (experiences or skills):
+        response_parts.extend(format_qa_section(results.get('qa', [])))
     
     if response_parts:
         return '\n\n'.join(response_parts)
     else:
-        return "I don't have specific information about that topic. Could you please ask about my professional experience, skills, or career background?"
+        return NO_INFORMATION_RESPONSE
+
+def stream_comprehensive_response(query: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (section, text) pairs as each section's retrieval finishes
+    Sections fan out one vector query each under the shared deadline; a section that
+    misses it is answered from the local fallback. A curated or cached answer is yielded whole
+    as ('answer', text). Q&A is held back because it is only shown when neither
+    experiences nor skills produced anything.
+    """
+    query = query.strip()
+    load_digital_twin_data()
+    curated = lookup_qa_answer(query)
+    if curated is not None:
+        yield 'answer', curated
+        return
+    variant = response_variant(query)
+    cached = lookup_cached_answer(query, variant)
+    if cached is not None:
+        yield 'answer', cached
+        return
+    
+    plan = plan_query(query)
+    searches = section_searches(plan)
+    
+    def run_section(section: str) -> Tuple[Optional[List[ChunkRecord]], Any]:
+        top_k = plan.sections[section]
+        vector_results = vector_query_or_none(query, top_k, SECTION_TYPES[section][0])
+        candidates = section_candidates(query, section, vector_results, top_k, HYBRID_RETRIEVAL)
+        return vector_results, searches[section](query, vector_results=candidates)
+    
+    futures = {search_executor.submit(copy_context().run, run_section, section): section for section in searches}
+    results: Dict[str, Any] = {'query': query, 'timestamp': datetime.now().isoformat()}
+    degraded = False
+    emitted = False
+    
+    def section_text(section: str) -> str:
+        if section == 'personal_info':
+            parts = format_personal_section(results['personal_info'], query)
+        elif section == 'experiences':
+            parts = format_experience_section(results['experiences'])
+        elif section == 'skills':
+            # Experiences may still be in flight; only skip the header once they are known
+            parts = format_skills_section(results['skills'], include_header=not results.get('experiences'))
+        else:
+            parts = []
+        return '\n\n'.join(parts)
+    
+    deadline = time.monotonic() + SEARCH_DEADLINE_SECONDS
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            section = futures[future]
+            try:
+                vector_results, results[section] = future.result()
+            except Exception as e:
+                logger.error(f"❌ {section} search failed: {str(e)}")
+                vector_results, results[section] = None, searches[section](query, vector_results=[])
+            degraded = degraded or vector_results is None
+            text = section_text(section)
+            if text:
+                emitted = True
+                yield section, text
+    
+    for future in pending:
+        future.cancel()
+        section = futures[future]
+        logger.warning(f"⏱️ {section} search missed the {SEARCH_DEADLINE_SECONDS}s deadline")
+        results[section] = searches[section](query, vector_results=[])
+        degraded = True
+        text = section_text(section)
+        if text:
+            emitted = True
+            yield section, text
+    
+    if not (results.get('experiences') or results.get('skills')):
+        text = '\n\n'.join(format_qa_section(results.get('qa', [])))
+        if text:
+            emitted = True
+            yield 'qa', text
+    
+    if not emitted:
+        yield 'answer', NO_INFORMATION_RESPONSE
+    
+    results['degraded'] = degraded
+    if not degraded:
+        response_cache.set(query, format_comprehensive_response(results, query), variant)
 
-@lru_cache(maxsize=CACHE_SIZE)
+@timed(STAGE_SECONDS, stage='cached_query')
 def cached_query(query: str) -> str:
-    """Cached version of the main query function"""
+    """Cached version of the main query function (degraded answers are not cached)"""
+    # Rate-limited freshness check; invalidates the cache if the twin JSON was edited
+    load_digital_twin_data()
+    
+    curated = lookup_qa_answer(query)
+    if curated is not None:
+        return curated
+    
+    variant = response_variant(query)
+    cached = lookup_cached_answer(query, variant)
+    if cached is not None:
+        return cached
+    
+    # Keyed like the cache, so a burst of the same uncached question runs the pipeline once
+    return coalesce(answer_flight, 'answer', response_cache.make_key(query, variant),
+                    compute_answer, query, variant)
+
+def compute_answer(query: str, variant: str) -> str:
+    """Run the retrieval pipeline and cache the formatted answer unless it is degraded"""
     results = comprehensive_search(query)
-    return format_comprehensive_response(results, query)
+    response = format_comprehensive_response(results, query)
+    if not results.get('degraded'):
+        response_cache.set(query, response, variant)
+    return response
+
+def lookup_cached_answer(query: str, variant: str) -> Optional[str]:
+    """Response cache lookup, counted for the /metrics hit ratio"""
+    cached = response_cache.get(query, variant)
+    CACHE_LOOKUPS.inc(result='miss' if cached is None else 'hit')
+    return cached
+
+def response_variant(query: str) -> str:
+    """
+    The query's intents, which decide the plan and the answer's shape, so queries that
+    normalize alike (e.g. differing only by 'about') never share a cache entry;
+    prefixed with the twin ID for every twin but the default one
+    """
+    signature = classify_query(query).signature
+    twin_id = current_twin_id()
+    return signature if twin_id == DEFAULT_TWIN_ID else f"{twin_id}/{signature}"
+
+def variant_twin_id(variant: str) -> str:
+    """Twin a response_variant belongs to"""
+    twin_id, separator, _ = variant.partition('/')
+    return twin_id if separator else DEFAULT_TWIN_ID
 
-def mcp_answer_query(query: str) -> Dict[str, Any]:
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of the response cache"""
+    return response_cache.stats()
+
+def mcp_answer_query(query: str, twin_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Main MCP function to answer queries about the digital twin
-    Uses Upstash Vector's automatic embedding for semantic search
+    Uses Upstash Vector's automatic embedding for semantic search.
+    twin_id picks one of the registry's twins; None answers for the default twin.
     """
+    if not twin_registry.exists(twin_id):
+        return unknown_twin_answer(twin_id)
     try:
         # Validate input
         if not query or not query.strip():
-            return {
-                'content': "Please provide a question about my professional background, skills, or experience.",
-                'metadata': {'error': 'empty_query'}
-            }
+            return empty_query_answer()
         
         # Get comprehensive response
-        response_content = cached_query(query.strip())
-        
-        return {
-            'content': response_content,
-            'metadata': {
-                'query': query,
-                'timestamp': datetime.now().isoformat(),
-                'vector_search_enabled': index_readonly is not None
-            }
-        }
+        started = time.perf_counter()
+        with use_twin(twin_id):
+            response_content = cached_query(query.strip())
+        elapsed = time.perf_counter() - started
+        query_latency.record(elapsed)
+        # Write-behind: only enqueues, the batch insert happens on the analytics worker
+        record_chat(query, response_content, elapsed, classify_query(query).signature or 'general',
+                    twin_id=twin_id or DEFAULT_TWIN_ID)
+        return query_answer(query, response_content)
         
     except Exception as e:
-        logger.error(f"Error processing query '{query}': {str(e)}")
-        return {
-            'content': "I'm sorry, I encountered an error processing your question. Please try rephrasing your query.",
-            'metadata': {'error': str(e)}
+        return query_error_answer(query, e)
+
+def unknown_twin_answer(twin_id: Optional[str]) -> Dict[str, Any]:
+    return {
+        'content': f"No digital twin is registered under '{twin_id}'.",
+        'metadata': {'error': 'unknown_twin', 'twin_id': twin_id}
+    }
+
+def empty_query_answer() -> Dict[str, Any]:
+    return {
+        'content': "Please provide a question about my professional background, skills, or experience.",
+        'metadata': {'error': 'empty_query'}
+    }
+
+def query_answer(query: str, response_content: str) -> Dict[str, Any]:
+    return {
+        'content': response_content,
+        'metadata': {
+            'query': query,
+            'timestamp': datetime.now().isoformat(),
+            'vector_search_enabled': get_vector_index() is not None
         }
+    }
+
+def query_error_answer(query: str, e: Exception) -> Dict[str, Any]:
+    logger.error(f"Error processing query '{query}': {str(e)}")
+    return {
+        'content': "I'm sorry, I encountered an error processing your question. Please try rephrasing your query.",
+        'metadata': {'error': str(e)}
+    }
+
+def answer_query_group(queries: List[str]) -> List[str]:
+    """Answer a group of distinct, uncached queries with one bulk vector round trip"""
+    plans = [plan_query(query) for query in queries]
+    prefetched = multi_type_vector_query_many(queries, [plan_type_top_k(plan) for plan in plans])
+    
+    answers = []
+    for query, plan, query_prefetched in zip(queries, plans, prefetched):
+        vector_results = {
+            section: query_prefetched.get(SECTION_TYPES[section][0], []) if query_prefetched is not None else None
+            for section in plan.sections
+        }
+        results = assemble_search_results(query, plan, vector_results)
+        response = format_comprehensive_response(results, query)
+        if not results.get('degraded'):
+            response_cache.set(query, response, response_variant(query))
+        answers.append(response)
+    return answers
+
+def answer_query_groups(groups: List[List[str]]) -> List[Any]:
+    """answer_query_group for each group in turn; a group that fails yields its exception instead"""
+    answers: List[Any] = []
+    for group in groups:
+        try:
+            answers.append(answer_query_group(group))
+        except Exception as e:
+            answers.append(e)
+    return answers
+
+def mcp_answer_queries(queries: List[str], twin_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Answer many questions in one call, returning results in input order
+    Inputs are deduped by normalized cache key; cache misses are grouped into bulk
+    vector requests of BULK_QUERY_GROUP_SIZE that run in parallel on at most
+    BULK_MAX_SEARCH_WORKERS workers of the search pool.
+    """
+    if not twin_registry.exists(twin_id):
+        return [unknown_twin_answer(twin_id) for _ in queries]
+    started = time.perf_counter()
+    with use_twin(twin_id):
+        answers = answer_queries(queries)
+    elapsed = time.perf_counter() - started
+    # Every answered question is one chat event; its response time is how long the batch took
+    for query, answer in zip(queries, answers):
+        if 'error' not in answer['metadata']:
+            record_chat(query, answer['content'], elapsed, classify_query(query).signature or 'general',
+                        twin_id=twin_id or DEFAULT_TWIN_ID)
+    return answers
+
+def answer_queries(queries: List[str]) -> List[Dict[str, Any]]:
+    """mcp_answer_queries for the current twin"""
+    load_digital_twin_data()
+    answers: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+    pending: Dict[Tuple[str, str], List[int]] = {}
+    representative: Dict[Tuple[str, str], str] = {}
+    
+    for position, query in enumerate(queries):
+        if not isinstance(query, str) or not query.strip():
+            answers[position] = empty_query_answer()
+            continue
+        stripped = query.strip()
+        curated = lookup_qa_answer(stripped)
+        if curated is not None:
+            answers[position] = query_answer(query, curated)
+            continue
+        variant = response_variant(stripped)
+        key = response_cache.make_key(stripped, variant)
+        if key not in pending:
+            cached = lookup_cached_answer(stripped, variant)
+            if cached is not None:
+                answers[position] = query_answer(query, cached)
+                continue
+            representative[key] = stripped
+        pending.setdefault(key, []).append(position)
+    
+    keys = list(pending)
+    groups = [keys[i:i + BULK_QUERY_GROUP_SIZE] for i in range(0, len(keys), BULK_QUERY_GROUP_SIZE)]
+    workers = min(len(groups), max(1, BULK_MAX_SEARCH_WORKERS))
+    # Worker n answers groups n, n + workers, ... one after another
+    futures = {search_executor.submit(copy_context().run, answer_query_groups,
+                                      [[representative[key] for key in group] for group in groups[n::workers]]):
+               groups[n::workers]
+               for n in range(workers)}
+    
+    for future, worker_groups in futures.items():
+        for group, contents in zip(worker_groups, future.result()):
+            if isinstance(contents, Exception):
+                for key in group:
+                    for position in pending[key]:
+                        answers[position] = query_error_answer(queries[position], contents)
+                continue
+            for key, content in zip(group, contents):
+                for position in pending[key]:
+                    answers[position] = query_answer(queries[position], content)
+    
+    return answers
 
 def get_interview_qa_response(query: str) -> str:
     """Get interview Q&A response - simplified interface"""
@@ -415,27 +1223,106 @@ def validate_query(query: str) -> Tuple[bool, Optional[str]]:
     
     return True, None
 
+def probe_dependencies() -> Dict[str, Any]:
+    """
+    One background health probe: twin data freshness plus a cheap vector DB round trip
+    Uses info() rather than a query so probes do not spend query quota; skipped while
+    the circuit breaker is open
+    """
+    status: Dict[str, Any] = {'local_data_available': bool(load_digital_twin_data())}
+    index_readonly = get_vector_index()
+    status['vector_db_available'] = index_readonly is not None
+    if index_readonly is None:
+        return status
+    
+    breaker = getattr(index_readonly, 'breaker', None)
+    if breaker is not None:
+        status['vector_db_circuit'] = breaker.stats()
+        if status['vector_db_circuit']['state'] == 'open':
+            status['vector_db_responsive'] = False
+            return status
+    
+    if not hasattr(index_readonly, 'info'):
+        # In-process index (RETRIEVER_BACKEND=local): nothing remote to probe
+        status['vector_db_responsive'] = True
+        return status
+    try:
+        info = index_readonly.info()
+        status['vector_db_responsive'] = True
+        status['vector_db_count'] = getattr(info, 'vector_count', None)
+    except Exception as e:
+        logger.warning(f"⚠️ Vector DB health probe failed: {str(e)}")
+        status['vector_db_responsive'] = False
+    return status
+
+health_monitor = HealthMonitor(probe_dependencies, interval=HEALTH_PROBE_INTERVAL_SECONDS)
+
+def liveness() -> Dict[str, Any]:
+    """The process is up and serving; never touches dependencies"""
+    return {'status': 'alive', 'timestamp': datetime.now().isoformat()}
+
+def readiness() -> Dict[str, Any]:
+    """
+    Whether queries can be answered, from the cached probe snapshot
+    Ready needs only the local twin data (vector search has a local fallback);
+    a missing or unresponsive vector DB reports 'degraded'
+    """
+    snapshot = health_monitor.snapshot()
+    if not snapshot.get('local_data_available'):
+        status = 'not_ready'
+    elif snapshot.get('vector_db_responsive'):
+        status = 'ready'
+    else:
+        status = 'degraded'
+    return {'status': status, 'ready': status != 'not_ready', 'checks': snapshot, 'latency': latency_stats()}
+
+def latency_stats() -> Dict[str, Any]:
+    """Percentiles of recent answered queries and vector DB round trips"""
+    return {
+        'query': query_latency.percentiles(),
+        'vector_db': vector_latency.percentiles(),
+    }
+
 # Health check function
 def health_check() -> Dict[str, Any]:
-    """Check system health"""
-    health_status = {
-        'timestamp': datetime.now().isoformat(),
-        'vector_db_available': index_readonly is not None,
-        'local_data_available': bool(load_digital_twin_data()),
-    }
-    
-    if index_readonly:
+    """Cached dependency status plus latency percentiles and cache counters from real traffic"""
+    health_status = {'timestamp': datetime.now().isoformat()}
+    health_status.update(health_monitor.snapshot())
+    health_status['latency'] = latency_stats()
+    health_status['cache'] = cache_stats()
+    health_status['analytics'] = analytics_stats()
+    health_status['twins'] = twin_registry.stats()
+    health_status['coalescing'] = {'answers': answer_flight.stats(), 'vector': vector_flight.stats()}
+    return health_status
+
+def prewarm(background: bool = True) -> Optional[threading.Thread]:
+    """
+    Create the vector clients and load the twin data and indexes ahead of the first query
+    With background=True this runs on a daemon thread and returns it
+    """
+    def warm() -> None:
+        started = time.perf_counter()
         try:
-            # Test vector query
-            test_results = safe_vector_query("test", top_k=1)
-            health_status['vector_db_responsive'] = True
-            health_status['vector_db_count'] = len(test_results)
-        except:
-            health_status['vector_db_responsive'] = False
+            load_digital_twin_data()
+            get_lexical_index()
+            get_qa_table()
+            vector_index = get_vector_index()
+            if hasattr(vector_index, 'build'):
+                vector_index.build()
+            logger.info(f"🔥 Retrieval pipeline prewarmed in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            logger.error(f"❌ Prewarm failed (will initialize on first query): {str(e)}")
     
-    return health_status
+    if not background:
+        warm()
+        return None
+    thread = threading.Thread(target=warm, name="twin-prewarm", daemon=True)
+    thread.start()
+    return thread
 
 if __name__ == "__main__":
+    configure_logging()
+    
     # Test the system
     print("🔧 Testing Digital Twin MCP Server with Automatic Embedding")
     
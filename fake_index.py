@@ -0,0 +1,102 @@
+"""
+Fake Vector Index
+In-memory stand-in for upstash_vector.Index (upsert, delete, query, query_many, info)
+for exercising ingestion and the query pipeline without network access or quota.
+Queries can be given injected latency and failures to stand in for a remote Upstash.
+"""
+
+import random
+import threading
+import time
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence
+
+from lexical_index import tokenize
+
+class FakeQueryResult(NamedTuple):
+    """Mirror of upstash_vector.types.QueryResult fields used by the server"""
+    id: str
+    score: float
+    metadata: Optional[Dict[str, Any]]
+
+class FakeInfo(NamedTuple):
+    vector_count: int
+
+class FakeIndex:
+    """
+    Dictionary-backed index; scores are token-overlap Jaccard mapped onto
+    Upstash's [0.5, 1] cosine score range so SIMILARITY_THRESHOLD behaves alike.
+    Each query/query_many round trip sleeps latency +/- jitter seconds and raises
+    ConnectionError with probability failure_rate (seeded for reproducible runs).
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.failed_calls = 0
+        self._lock = threading.Lock()
+        self.namespaces: Dict[str, Dict[str, Dict[str, Any]]] = {'': {}}
+        self.upsert_calls = 0
+        self.delete_calls = 0
+        self.query_calls = 0
+
+    def upsert(self, vectors: Sequence[Dict[str, Any]], namespace: str = '') -> str:
+        with self._lock:
+            self.upsert_calls += 1
+            stored = self.namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                stored[vector['id']] = {
+                    'data': vector.get('data', ''),
+                    'tokens': frozenset(tokenize(vector.get('data', ''))),
+                    'metadata': vector.get('metadata') or {},
+                }
+        return 'Success'
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = '', **kwargs: Any) -> Dict[str, int]:
+        with self._lock:
+            self.delete_calls += 1
+            stored = self.namespaces.get(namespace, {})
+            deleted = sum(1 for vector_id in ids or [] if stored.pop(vector_id, None) is not None)
+        return {'deleted': deleted}
+
+    def simulate_round_trip(self) -> None:
+        """Injected network latency and failures"""
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)) if self.latency else 0.0
+            failed = self.failure_rate > 0 and self._random.random() < self.failure_rate
+            if failed:
+                self.failed_calls += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise ConnectionError("Injected vector DB failure")
+
+    def query(self, data: str = '', top_k: int = 10, include_metadata: bool = False,
+              namespace: str = '', **kwargs: Any) -> List[FakeQueryResult]:
+        self.simulate_round_trip()
+        return self._search(data, top_k, include_metadata, namespace)
+
+    def _search(self, data: str, top_k: int, include_metadata: bool, namespace: str = '') -> List[FakeQueryResult]:
+        with self._lock:
+            self.query_calls += 1
+            vectors = list(self.namespaces.get(namespace, {}).items())
+        query_tokens = frozenset(tokenize(data))
+        scored = []
+        for vector_id, vector in vectors:
+            union = len(query_tokens | vector['tokens'])
+            similarity = len(query_tokens & vector['tokens']) / union if union else 0.0
+            scored.append(FakeQueryResult(vector_id, 0.5 + similarity / 2,
+                                          vector['metadata'] if include_metadata else None))
+        scored.sort(key=lambda result: result.score, reverse=True)
+        return scored[:top_k]
+
+    def query_many(self, queries: List[Dict[str, Any]], namespace: str = '') -> List[List[FakeQueryResult]]:
+        # One round trip for the whole batch, like the real bulk endpoint
+        self.simulate_round_trip()
+        return [self._search(query.get('data', ''), query.get('top_k', 10), query.get('include_metadata', False), namespace)
+                for query in queries]
+
+    def info(self) -> FakeInfo:
+        return FakeInfo(vector_count=sum(len(stored) for stored in self.namespaces.values()))
@@ -0,0 +1,93 @@
+"""
+Health Subsystem
+Rolling latency windows fed by real traffic and a background monitor that refreshes
+dependency status on an interval, so health endpoints serve a cached snapshot
+instead of issuing a live vector query per probe.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW_SIZE = 1024  # Most recent samples kept per window
+
+class LatencyWindow:
+    """Thread-safe ring buffer of recent durations with nearest-rank percentiles"""
+
+    def __init__(self, maxlen: int = LATENCY_WINDOW_SIZE):
+        self._samples: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.total += 1
+
+    def percentiles(self) -> Dict[str, Any]:
+        """p50/p95/p99 in milliseconds over the window; None before any traffic"""
+        with self._lock:
+            samples = sorted(self._samples)
+            total = self.total
+        stats: Dict[str, Any] = {'window': len(samples), 'total': total}
+        for name, fraction in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            if samples:
+                rank = min(len(samples) - 1, max(0, int(fraction * len(samples) + 0.5) - 1))
+                stats[name] = round(samples[rank] * 1000, 1)
+            else:
+                stats[name] = None
+        return stats
+
+class HealthMonitor:
+    """
+    Runs probe() once when started, then every interval seconds on a daemon thread
+    snapshot() never blocks on the dependencies; it returns the last probe result
+    """
+
+    def __init__(self, probe: Callable[[], Dict[str, Any]], interval: float = 30.0):
+        self.probe = probe
+        self.interval = interval
+        self._snapshot: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Idempotent; the first probe runs inline so the first snapshot is never empty"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.refresh()
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def refresh(self) -> Dict[str, Any]:
+        """Probe now and replace the cached snapshot"""
+        started = time.perf_counter()
+        try:
+            result = self.probe()
+        except Exception as e:
+            logger.error(f"❌ Health probe failed: {str(e)}")
+            result = {'probe_error': str(e)}
+        result['checked_at'] = datetime.now().isoformat()
+        result['probe_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        self._snapshot = result
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        self.start()
+        return dict(self._snapshot)
@@ -1,103 +1,96 @@
+"""
+Digital Twin HTTP API (Vercel entry point)
+Static GET bodies are encoded once at import; /api/query is answered by the retrieval
+pipeline in digital_twin_mcp_server_optimized.py, imported lazily on first use.
+/api/query can also stream Server-Sent Events, one per answer section.
+"""
+
+import hashlib
 import json
+import logging
 import os
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
 from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 
-class handler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        path = self.path
-        
-        # Set proper headers for all responses
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Cache-Control', 'no-cache')
-        self.end_headers()
-        
-        if path == '/health':
-            response = {
-                'status': 'healthy',
-                'timestamp': datetime.now().isoformat(),
-                'services': {
-                    'database': 'configured' if os.getenv('DATABASE_URL') else 'missing',
-                    'vector_db': 'configured' if os.getenv('UPSTASH_VECTOR_REST_URL') else 'missing',
-                    'groq_api': 'configured' if os.getenv('GROQ_API_KEY') else 'missing'
-                },
-                'message': 'Digital Twin API is healthy and ready'
-            }
-        
-        elif path == '/api/test':
-            response = {
-                'message': "🤖 Regine's Digital Twin API is working perfectly!",
-                'timestamp': datetime.now().isoformat(),
-                'version': '4.0',
-                'status': 'success',
-                'features': ['AI Chat', 'Health Check', 'Professional Q&A'],
-                'author': 'Regine Aniban - Business Analyst'
-            }
-        
-        else:
-            # Home page
-            response = {
-                'name': "🤖 Regine's Professional Digital Twin",
-                'description': 'AI-powered assistant showcasing 13+ years of Business Analysis expertise',
-                'welcome_message': 'Welcome to my interactive professional portfolio!',
-                'endpoints': {
-                    'health': '/health - Check system status',
-                    'test': '/api/test - Test API functionality', 
-                    'query': '/api/query (POST) - Ask questions about my experience'
-                },
-                'professional_info': {
-                    'name': 'Regine Aniban',
-                    'role': 'Senior Business Analyst',
-                    'experience': '13+ years',
-                    'location': 'Melbourne, Australia',
-                    'email': 'aniban.regine@gmail.com'
-                },
-                'core_competencies': [
-                    'Requirements Analysis',
-                    'Stakeholder Management', 
-                    'Process Improvement',
-                    'Digital Transformation',
-                    'Agile Delivery'
-                ],
-                'version': '4.0',
-                'deployed_on': 'Vercel'
-            }
-        
-        # Write response
-        self.wfile.write(json.dumps(response, indent=2).encode('utf-8'))
-    
-    def do_POST(self):
-        if self.path == '/api/query':
-            # Read request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            
-            # Set proper headers
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Cache-Control', 'no-cache')
-            self.end_headers()
-            
-            try:
-                data = json.loads(body.decode('utf-8'))
-                query = data.get('query', '').strip()
-                
-                if not query:
-                    response = {
-                        'error': 'Query is required',
-                        'example': 'POST /api/query with {"query": "What are your core competencies?"}'
-                    }
-                    self.wfile.write(json.dumps(response, indent=2).encode('utf-8'))
-                    return
-                
-                # Professional response based on query content
-                query_lower = query.lower()
-                
-                if any(word in query_lower for word in ['competenc', 'skill', 'abilit']):
-                    content = """My core competencies include:
+import analytics
+import metrics
+from logging_setup import configure_logging
+from query_intent import classify_query
+from twin_registry import use_twin
+
+# This is the entry point, so it (not the retrieval library) configures logging
+configure_logging()
+logger = logging.getLogger(__name__)
+
+API_VERSION = '4.0'
+TIMESTAMP_PLACEHOLDER = '__TIMESTAMP__'
+
+HOME_RESPONSE = {
+    'name': "🤖 Regine's Professional Digital Twin",
+    'description': 'AI-powered assistant showcasing 13+ years of Business Analysis expertise',
+    'welcome_message': 'Welcome to my interactive professional portfolio!',
+    'endpoints': {
+        'health': '/health - Check system status',
+        'liveness': '/health/live - Process is up (no dependency checks)',
+        'readiness': '/health/ready - Ready to answer queries (503 when not)',
+        'metrics': '/metrics - Prometheus metrics',
+        'test': '/api/test - Test API functionality', 
+        'query': '/api/query (POST) - Ask questions about my experience'
+    },
+    'professional_info': {
+        'name': 'Regine Aniban',
+        'role': 'Senior Business Analyst',
+        'experience': '13+ years',
+        'location': 'Melbourne, Australia',
+        'email': 'aniban.regine@gmail.com'
+    },
+    'core_competencies': [
+        'Requirements Analysis',
+        'Stakeholder Management', 
+        'Process Improvement',
+        'Digital Transformation',
+        'Agile Delivery'
+    ],
+    'version': API_VERSION,
+    'deployed_on': 'Vercel'
+}
+
+# Respondent of the canned answers (which describe the default twin) when retrieval is unavailable
+DEFAULT_RESPONDENT = 'Regine Aniban - Business Analyst'
+
+TEST_RESPONSE = {
+    'message': "🤖 Regine's Digital Twin API is working perfectly!",
+    'timestamp': TIMESTAMP_PLACEHOLDER,
+    'version': API_VERSION,
+    'status': 'success',
+    'features': ['AI Chat', 'Health Check', 'Professional Q&A'],
+    'author': 'Regine Aniban - Business Analyst'
+}
+
+HEALTH_RESPONSE = {
+    'status': 'healthy',
+    'timestamp': TIMESTAMP_PLACEHOLDER,
+    'services': {
+        'database': 'configured' if os.getenv('DATABASE_URL') else 'missing',
+        'vector_db': 'configured' if os.getenv('UPSTASH_VECTOR_REST_URL') else 'missing',
+        'groq_api': 'configured' if os.getenv('GROQ_API_KEY') else 'missing'
+    },
+    'message': 'Digital Twin API is healthy and ready'
+}
+
+NEXT_QUESTIONS = [
+    'What methodologies do you use?',
+    'Tell me about your stakeholder management approach',
+    'What was your biggest achievement at Etisalat?'
+]
+
+# Canned answers, used when the retrieval pipeline is unavailable
+COMPETENCIES_CONTENT = """My core competencies include:
 
 🎯 **Requirements Analysis** - Expert in stakeholder interviews, business process mapping, and functional specification development
 
@@ -112,9 +105,8 @@ class handler(BaseHTTPRequestHandler):
 💼 **Business Intelligence** - Capable in data analysis, reporting solutions, and KPI development
 
 With 13+ years of progressive experience across telecommunications, technology, and customer experience domains."""
-                
-                elif any(word in query_lower for word in ['experience', 'work', 'job', 'asurion', 'etisalat']):
-                    content = """My professional experience spans 13+ years across leading organizations:
+
+EXPERIENCE_CONTENT = """My professional experience spans 13+ years across leading organizations:
 
 🏢 **Asurion Australia** - Business Analyst
 - Led digital transformation initiatives
@@ -132,9 +124,8 @@ With 13+ years of progressive experience across telecommunications, technology,
 - Requirements analysis and solution design
 
 My experience covers telecommunications, technology, and customer service domains with a focus on digital transformation and process optimization."""
-                
-                elif any(word in query_lower for word in ['achievement', 'award', 'accomplish']):
-                    content = """My key professional achievements include:
+
+ACHIEVEMENTS_CONTENT = """My key professional achievements include:
 
 🏆 **35% Support Ticket Reduction** - Led the successful launch of Help & Support feature in My Etisalat app, resulting in significant operational efficiency gains
 
@@ -147,9 +138,8 @@ My experience covers telecommunications, technology, and customer service domain
 📊 **Data-Driven Results** - Implemented analytics and reporting solutions that provided actionable insights for business decision-making
 
 These achievements demonstrate my ability to drive tangible business value through strategic analysis and effective project delivery."""
-                
-                else:
-                    content = f"""Thank you for your question: "{query}"
+
+GENERAL_CONTENT_TEMPLATE = """Thank you for your question: "{query}"
 
 I'm Regine Aniban, a Senior Business Analyst with 13+ years of experience in digital transformation and process optimization. I specialize in:
 
@@ -162,53 +152,423 @@ I'm Regine Aniban, a Senior Business Analyst with 13+ years of experience in dig
 I have successfully delivered projects across telecommunications, technology, and customer experience domains, with notable achievements including a 35% reduction in support tickets through strategic app feature development.
 
 Feel free to ask me more specific questions about my experience, skills, methodologies, or achievements!"""
+
+def encode_json(payload: Any) -> bytes:
+    """Compact UTF-8 JSON body"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class StaticBody(NamedTuple):
+    """Response body encoded once at import, with its strong ETag"""
+    body: bytes
+    etag: str
+
+def static_body(payload: Any) -> StaticBody:
+    body = encode_json(payload)
+    return StaticBody(body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+
+class TimestampedBody(NamedTuple):
+    """Pre-encoded body whose only dynamic field is the timestamp, spliced in per request"""
+    prefix: bytes
+    suffix: bytes
+
+    def render(self) -> bytes:
+        return self.prefix + datetime.now().isoformat().encode('ascii') + self.suffix
+
+def timestamped_body(payload: Any) -> TimestampedBody:
+    prefix, suffix = encode_json(payload).split(TIMESTAMP_PLACEHOLDER.encode('ascii'))
+    return TimestampedBody(prefix, suffix)
+
+HOME_BODY = static_body(HOME_RESPONSE)
+TEST_BODY = timestamped_body(TEST_RESPONSE)
+HEALTH_BODY = timestamped_body(HEALTH_RESPONSE)
+EMPTY_QUERY_BODY = static_body({
+    'error': 'Query is required',
+    'example': 'POST /api/query with {"query": "What are your core competencies?"}'
+})
+INVALID_REQUEST_BODY = static_body({
+    'error': 'Internal server error',
+    'message': 'Please ensure you send valid JSON with a "query" field',
+    'example': '{"query": "What are your core competencies?"}'
+})
+NOT_FOUND_BODY = static_body({'error': 'Endpoint not found'})
+MAX_BATCH_QUERIES = 200
+INVALID_BATCH_BODY = static_body({
+    'error': 'A non-empty "queries" list is required',
+    'max_queries': MAX_BATCH_QUERIES,
+    'example': 'POST /api/query/batch with {"queries": ["What are your core competencies?", "What methodologies do you use?"]}'
+})
+
+# Per-request tracing: on for requests sending X-Trace-Id, or for all requests with TRACE_REQUESTS=true
+TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() == "true"
+
+# Retrieval module, imported on first query so GET-only cold starts stay light
+# PREWARM_RETRIEVAL=true imports and warms it on a background thread at startup instead
+PREWARM_RETRIEVAL = os.getenv("PREWARM_RETRIEVAL", "false").lower() == "true"
+_retrieval_module = None
+_retrieval_lock = threading.Lock()
+
+def get_retrieval_module() -> Optional[Any]:
+    """Import digital_twin_mcp_server_optimized once; None if it cannot be loaded"""
+    global _retrieval_module
+    if _retrieval_module is None:
+        with _retrieval_lock:
+            if _retrieval_module is None:
+                try:
+                    import digital_twin_mcp_server_optimized as retrieval
+                    _retrieval_module = retrieval
+                except Exception as e:
+                    logger.error(f"❌ Retrieval pipeline unavailable, using canned answers: {str(e)}")
+                    _retrieval_module = False
+    return _retrieval_module or None
+
+def prewarm_retrieval() -> threading.Thread:
+    """Import the retrieval pipeline and build its clients/indexes on a daemon thread"""
+    def warm() -> None:
+        retrieval = get_retrieval_module()
+        if retrieval is not None:
+            retrieval.prewarm(background=False)
+    
+    thread = threading.Thread(target=warm, name="retrieval-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def canned_content(query: str) -> str:
+    """Intent-matched canned answer for when retrieval is unavailable"""
+    intent = classify_query(query)
+    
+    if intent.has('skills'):
+        return COMPETENCIES_CONTENT
+    elif intent.has('experience'):
+        return EXPERIENCE_CONTENT
+    elif intent.has('achievement'):
+        return ACHIEVEMENTS_CONTENT
+    return GENERAL_CONTENT_TEMPLATE.format(query=query)
+
+def twin_known(twin_id: Optional[str]) -> bool:
+    """Whether twin_id (None: the default twin) can be answered; other twins need the retrieval pipeline"""
+    if not twin_id:
+        return True
+    retrieval = get_retrieval_module()
+    return retrieval is not None and retrieval.twin_registry.exists(twin_id)
+
+def answer_query(query: str, twin_id: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Answer via mcp_answer_query (which records analytics), falling back to canned content on failure
+    The canned answers describe the default twin, so other twins get the retrieval error message instead
+    """
+    started = time.perf_counter()
+    retrieval = get_retrieval_module()
+    if retrieval is not None:
+        result = retrieval.mcp_answer_query(query, twin_id=twin_id)
+        metadata = result.get('metadata', {})
+        if 'error' not in metadata or twin_id:
+            return result.get('content', ''), {
+                'source': 'retrieval',
+                'vector_search_enabled': metadata.get('vector_search_enabled', False)
+            }
+    content = canned_content(query)
+    analytics.record_chat(query, content, time.perf_counter() - started, 'canned')
+    return content, {'source': 'canned'}
+
+def answer_queries(queries: list, twin_id: Optional[str] = None) -> list:
+    """
+    Answer many questions in order via mcp_answer_queries (which records analytics),
+    or canned content without retrieval
+    """
+    retrieval = get_retrieval_module()
+    if retrieval is not None:
+        return [
+            {'query': query, 'content': result.get('content', ''), 'metadata': result.get('metadata', {})}
+            for query, result in zip(queries, retrieval.mcp_answer_queries(queries, twin_id=twin_id))
+        ]
+    started = time.perf_counter()
+    results = [
+        {'query': query, 'content': canned_content(query) if isinstance(query, str) else '', 'metadata': {'source': 'canned'}}
+        for query in queries
+    ]
+    elapsed = time.perf_counter() - started
+    for result in results:
+        if result['content']:
+            analytics.record_chat(result['query'], result['content'], elapsed, 'canned')
+    return results
+
+def health_report() -> Tuple[Dict[str, Any], int]:
+    """Cached readiness snapshot and its HTTP status; never issues a live vector query"""
+    retrieval = get_retrieval_module()
+    if retrieval is None:
+        return {'status': 'degraded', 'ready': True, 'checks': {'retrieval': 'unavailable, serving canned answers'},
+                'timestamp': datetime.now().isoformat()}, 200
+    report = retrieval.readiness()
+    report['timestamp'] = datetime.now().isoformat()
+    return report, 200 if report['ready'] else 503
+
+def stream_answer(query: str) -> Iterator[Tuple[str, str]]:
+    """(section, text) pairs as each section is ready, or one canned answer without retrieval"""
+    retrieval = get_retrieval_module()
+    if retrieval is not None:
+        yield from retrieval.stream_comprehensive_response(query)
+    else:
+        yield 'answer', canned_content(query)
+
+def encode_event(event: str, payload: Any) -> bytes:
+    """One Server-Sent Events frame"""
+    return b'event: ' + event.encode('ascii') + b'\ndata: ' + encode_json(payload) + b'\n\n'
+
+def respondent_metadata(twin_id: Optional[str] = None) -> Dict[str, str]:
+    """
+    Who answered: 'name - title' from the twin's profile (first part of a 'A | B' title),
+    plus twin_id for non-default twins; the canned identity when retrieval is unavailable
+    """
+    metadata = {'twin_id': twin_id} if twin_id else {}
+    retrieval = get_retrieval_module()
+    if retrieval is None:
+        return metadata if twin_id else {'respondent': DEFAULT_RESPONDENT}
+    with use_twin(twin_id):
+        personal = retrieval.load_digital_twin_data('personalInfo') or {}
+    name = personal.get('name')
+    title = (personal.get('title') or '').split('|')[0].strip()
+    if name:
+        metadata['respondent'] = f"{name} - {title}" if title else name
+    elif not twin_id:
+        metadata['respondent'] = DEFAULT_RESPONDENT
+    return metadata
+
+def build_query_response(query: str, twin_id: Optional[str] = None) -> Dict[str, Any]:
+    """Full /api/query response payload for a non-empty query"""
+    started = time.perf_counter()
+    content, answer_metadata = answer_query(query, twin_id)
+    return {
+        'content': content,
+        'metadata': {
+            'response_time': round(time.perf_counter() - started, 4),
+            'version': API_VERSION,
+            'query_received': query,
+            'category': 'professional_inquiry',
+            **respondent_metadata(twin_id),
+            **answer_metadata
+        },
+        'next_questions': NEXT_QUESTIONS
+    }
+
+class handler(BaseHTTPRequestHandler):
+    def send_body(self, body: bytes, status: int = 200, etag: Optional[str] = None,
+                  content_type: str = 'application/json', headers: Optional[Dict[str, str]] = None):
+        # Always send Content-Length so HTTP/1.1 connections can be kept alive
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-cache')
+        if etag:
+            self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_static(self, static: StaticBody, status: int = 200):
+        self.send_body(static.body, status, static.etag)
+    
+    def send_json(self, payload, status=200, headers: Optional[Dict[str, str]] = None):
+        self.send_body(encode_json(payload), status, headers=headers)
+    
+    def analytics_context(self):
+        """Attribute chat analytics recorded while answering to this HTTP client"""
+        client_address = getattr(self, 'client_address', None)
+        return analytics.request_context(source='http', user_ip=client_address[0] if client_address else None,
+                                         user_agent=self.headers.get('User-Agent'))
+    
+    def requested_twin(self, data: Dict[str, Any]) -> Optional[str]:
+        """Twin to answer for: 'twin_id' in the body or the X-Twin-Id header; None for the default twin"""
+        twin_id = data.get('twin_id') or self.headers.get('X-Twin-Id')
+        return str(twin_id) if twin_id else None
+    
+    def send_unknown_twin(self, twin_id: str):
+        self.send_json({'error': 'Unknown twin', 'twin_id': twin_id}, 404)
+    
+    def wants_stream(self, data: Dict[str, Any]) -> bool:
+        # ?stream=1, {"stream": true} or Accept: text/event-stream
+        params = parse_qs(urlsplit(self.path).query)
+        return (params.get('stream', [''])[0].lower() in ('1', 'true')
+                or data.get('stream') is True
+                or 'text/event-stream' in self.headers.get('Accept', ''))
+    
+    def send_event_stream(self, query: str, twin_id: Optional[str] = None):
+        # Chunked encoding keeps HTTP/1.1 connections reusable; HTTP/1.0 streams until close
+        chunked = self.request_version == 'HTTP/1.1' and self.protocol_version == 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        
+        def write(frame: bytes):
+            if chunked:
+                frame = f"{len(frame):x}\r\n".encode('ascii') + frame + b'\r\n'
+            self.wfile.write(frame)
+            self.wfile.flush()
+        
+        started = time.perf_counter()
+        sections = []
+        try:
+            for section, text in stream_answer(query):
+                write(encode_event('section', {'section': section, 'content': text}))
+                sections.append(text)
+        except Exception as e:
+            logger.error(f"Error streaming query '{query}': {str(e)}")
+            write(encode_event('error', {'error': 'Internal server error'}))
+        else:
+            analytics.record_chat(query, '\n\n'.join(sections), time.perf_counter() - started,
+                                  classify_query(query).signature or 'general')
+        
+        write(encode_event('done', {
+            'metadata': {
+                'response_time': round(time.perf_counter() - started, 4),
+                'version': API_VERSION,
+                'query_received': query,
+                'category': 'professional_inquiry',
+                **respondent_metadata(twin_id)
+            },
+            'next_questions': NEXT_QUESTIONS
+        }))
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+    
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        
+        if path in ('/health', '/health/live'):
+            # Liveness: pre-encoded, no dependency checks
+            self.send_body(HEALTH_BODY.render())
+        elif path == '/health/ready':
+            report, status = health_report()
+            self.send_json(report, status)
+        elif path == '/metrics':
+            # Registered by the retrieval module; empty until it has been imported
+            self.send_body(metrics.registry.render().encode('utf-8'), content_type=metrics.CONTENT_TYPE)
+        elif path == '/api/analytics':
+            # In-memory rollups of the write-behind chat analytics (popular questions, latency, queue)
+            self.send_json(analytics.analytics_stats())
+        elif path == '/api/test':
+            self.send_body(TEST_BODY.render())
+        else:
+            # Home page
+            self.send_static(HOME_BODY)
+    
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == '/api/query/batch':
+            self.handle_batch_query()
+        elif path == '/api/query':
+            # Read request body
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(content_length)
+            
+            try:
+                data = json.loads(body.decode('utf-8'))
+                query = data.get('query', '').strip()
+            except Exception:
+                self.send_static(INVALID_REQUEST_BODY)
+                return
+            
+            if not query:
+                self.send_static(EMPTY_QUERY_BODY)
+                return
+            
+            twin_id = self.requested_twin(data)
+            if not twin_known(twin_id):
+                self.send_unknown_twin(twin_id)
+                return
+            
+            with self.analytics_context(), use_twin(twin_id):
+                if self.wants_stream(data):
+                    self.send_event_stream(query, twin_id)
+                    return
                 
-                response = {
-                    'content': content,
-                    'metadata': {
-                        'response_time': 0.8,
-                        'version': '4.0',
-                        'query_received': query,
-                        'category': 'professional_inquiry',
-                        'respondent': 'Regine Aniban - Business Analyst'
-                    },
-                    'next_questions': [
-                        'What methodologies do you use?',
-                        'Tell me about your stakeholder management approach',
-                        'What was your biggest achievement at Etisalat?'
-                    ]
-                }
-                
-                self.wfile.write(json.dumps(response, indent=2).encode('utf-8'))
-                
-            except Exception as e:
-                response = {
-                    'error': 'Internal server error',
-                    'message': 'Please ensure you send valid JSON with a "query" field',
-                    'example': '{"query": "What are your core competencies?"}'
-                }
-                self.wfile.write(json.dumps(response, indent=2).encode('utf-8'))
+                trace_id = self.headers.get('X-Trace-Id')
+                with metrics.start_trace(trace_id) if trace_id or TRACE_REQUESTS else nullcontext() as trace:
+                    try:
+                        response = build_query_response(query, twin_id)
+                    except Exception as e:
+                        logger.error(f"Error answering query '{query}': {str(e)}")
+                        self.send_static(INVALID_REQUEST_BODY)
+                        return
+            
+            if trace is None:
+                self.send_json(response)
+                return
+            response['metadata']['trace'] = {'trace_id': trace.trace_id, 'stages_ms': trace.stage_totals()}
+            self.send_json(response, headers={'X-Trace-Id': trace.trace_id, 'Server-Timing': trace.server_timing()})
         
         else:
             # 404 for other POST requests
-            self.send_response(404)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            response = {'error': 'Endpoint not found'}
-            self.wfile.write(json.dumps(response, indent=2).encode('utf-8'))
+            self.send_static(NOT_FOUND_BODY, status=404)
+    
+    def handle_batch_query(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(content_length)
+        
+        try:
+            data = json.loads(body.decode('utf-8'))
+            queries = data.get('queries')
+        except Exception:
+            self.send_static(INVALID_REQUEST_BODY)
+            return
+        
+        if not isinstance(queries, list) or not queries or len(queries) > MAX_BATCH_QUERIES:
+            self.send_static(INVALID_BATCH_BODY)
+            return
+        
+        twin_id = self.requested_twin(data)
+        if not twin_known(twin_id):
+            self.send_unknown_twin(twin_id)
+            return
+        
+        started = time.perf_counter()
+        try:
+            with self.analytics_context():
+                results = answer_queries(queries, twin_id)
+        except Exception as e:
+            logger.error(f"Error answering batch of {len(queries)} queries: {str(e)}")
+            self.send_static(INVALID_REQUEST_BODY)
+            return
+        
+        self.send_json({
+            'results': results,
+            'count': len(results),
+            'metadata': {
+                'response_time': round(time.perf_counter() - started, 4),
+                'version': API_VERSION
+            }
+        })
     
     def do_OPTIONS(self):
         # Handle CORS preflight
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Accept, X-Trace-Id, X-Twin-Id')
         self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', '0')
         self.end_headers()
-        self.wfile.write(b'')
     
     def log_message(self, format, *args):
         # Suppress default logging to avoid Vercel issues
         pass
+
+if PREWARM_RETRIEVAL:
+    prewarm_retrieval()
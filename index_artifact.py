@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Persisted Index Artifact
+Compiles mytwin_refined.json into a versioned on-disk artifact (chunk metadata,
+BM25 postings and a NumPy vector matrix) so a cold start skips chunking, tokenizing
+and embedding. Only the vector matrix is memory-mapped; chunks and postings are
+small JSON files decoded in full, since every chunk is materialized at startup
+anyway and NumPy stays optional for the lexical path.
+
+Build it as part of the deploy step:
+    python index_artifact.py --data mytwin_refined.json --out .twin_index
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Dict, Any, NamedTuple, Optional
+
+from lexical_index import BM25Index
+from twin_chunks import build_chunks, chunk_search_text
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever chunking, tokenization or vectorization changes
+ARTIFACT_VERSION = 2
+
+MANIFEST_FILE = 'manifest.json'
+CHUNKS_FILE = 'chunks.json'
+POSTINGS_FILE = 'postings.json'
+VECTORS_FILE = 'vectors.npy'
+IDF_FILE = 'idf.npy'
+
+class TwinArtifact(NamedTuple):
+    """Everything the server needs to search without touching the source JSON"""
+    content_hash: str
+    chunks: List[Dict[str, Any]]
+    lexical_index: BM25Index
+    vectors: Optional[Any] = None
+    idf: Optional[Any] = None
+
+def import_numpy() -> Optional[Any]:
+    """
+    NumPy, imported on first use so importing this module stays cheap
+    Vectors are optional; the lexical part of the artifact still works without NumPy
+    """
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+def content_hash(data_path: str) -> str:
+    """SHA-256 of the raw twin JSON bytes"""
+    with open(data_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def build_artifact(data_path: str, out_dir: str) -> Dict[str, Any]:
+    """Compile the twin JSON into out_dir and return the written manifest"""
+    digest = content_hash(data_path)
+    with open(data_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    chunks = build_chunks(data)
+    lexical_index = BM25Index.build((chunk['id'], chunk['type'], chunk_search_text(chunk)) for chunk in chunks)
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, CHUNKS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(chunks, f, ensure_ascii=False, separators=(',', ':'))
+    with open(os.path.join(out_dir, POSTINGS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(lexical_index.to_dict(), f, separators=(',', ':'))
+
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'content_hash': digest,
+        'chunk_count': len(chunks),
+        'term_count': len(lexical_index.postings),
+        'vector_dim': None,
+        'created': datetime.now().isoformat(),
+    }
+
+    np = import_numpy()
+    if np is not None:
+        from local_vector import VECTOR_DIM, compute_vectors
+
+        matrix, idf = compute_vectors(chunks)
+        np.save(os.path.join(out_dir, VECTORS_FILE), matrix)
+        np.save(os.path.join(out_dir, IDF_FILE), idf)
+        manifest['vector_dim'] = VECTOR_DIM
+
+    # Manifest goes last so a half-written artifact never validates
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+def load_artifact(data_path: str, artifact_dir: str) -> Optional[TwinArtifact]:
+    """
+    Open a prebuilt artifact if it matches the current twin JSON
+    Returns None (caller rebuilds in memory) when missing, stale or from another version
+    """
+    manifest_path = os.path.join(artifact_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if manifest.get('version') != ARTIFACT_VERSION:
+            logger.warning(f"⚠️ Index artifact version {manifest.get('version')} != {ARTIFACT_VERSION}, ignoring")
+            return None
+        digest = content_hash(data_path)
+        if manifest.get('content_hash') != digest:
+            logger.warning("⚠️ Index artifact is stale (twin data changed), ignoring")
+            return None
+
+        # Decoded eagerly: a few tens of KB that the chunk records and Q&A table need in full
+        with open(os.path.join(artifact_dir, CHUNKS_FILE), 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+        with open(os.path.join(artifact_dir, POSTINGS_FILE), 'r', encoding='utf-8') as f:
+            lexical_index = BM25Index.from_dict(json.load(f))
+
+        vectors = idf = None
+        np = import_numpy() if manifest.get('vector_dim') else None
+        if np is not None:
+            from local_vector import VECTOR_DIM
+
+            if manifest['vector_dim'] == VECTOR_DIM:
+                # Memory-map the matrix: pages are only faulted in when a query touches them
+                vectors = np.load(os.path.join(artifact_dir, VECTORS_FILE), mmap_mode='r')
+                idf = np.load(os.path.join(artifact_dir, IDF_FILE))
+
+        logger.info(f"✅ Loaded index artifact ({manifest.get('chunk_count')} chunks)")
+        return TwinArtifact(digest, chunks, lexical_index, vectors, idf)
+
+    except Exception as e:
+        logger.error(f"❌ Failed to load index artifact: {str(e)}")
+        return None
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build the persisted digital twin index artifact")
+    parser.add_argument('--data', default='mytwin_refined.json', help="Path to the twin JSON")
+    parser.add_argument('--out', default='.twin_index', help="Artifact output directory")
+    args = parser.parse_args()
+
+    manifest = build_artifact(args.data, args.out)
+    print(f"📦 Built index artifact in {args.out}: {manifest['chunk_count']} chunks, "
+          f"{manifest['term_count']} terms, content hash {manifest['content_hash'][:12]}")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Digital Twin Ingestion
+Chunks mytwin_refined.json into the metadata shape safe_vector_query expects and
+syncs it into the vector index incrementally: only new or changed chunks are
+upserted (in large batches) and removed chunks are deleted. Progress is saved
+after every batch, so an interrupted run resumes where it stopped.
+
+    python ingest.py                 # sync changes into Upstash
+    python ingest.py --dry-run       # show the diff without writing
+    python ingest.py --full          # re-upsert every chunk
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from twin_chunks import build_chunks, chunk_search_text
+from vector_client import NamespacedIndex
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_FILE = os.path.join(BASE_DIR, 'mytwin_refined.json')
+DEFAULT_STATE_FILE = os.path.join(BASE_DIR, '.ingest_state.json')
+
+UPSERT_BATCH_SIZE = 100
+DELETE_BATCH_SIZE = 500
+STATE_VERSION = 1
+
+def chunk_to_vector(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Upstash upsert payload: raw text for server-side embedding plus metadata"""
+    return {
+        'id': chunk['id'],
+        'data': chunk_search_text(chunk),
+        'metadata': {key: value for key, value in chunk.items() if key != 'id'},
+    }
+
+def vector_hash(vector: Dict[str, Any]) -> str:
+    """Content hash of everything that ends up in the index for a chunk"""
+    payload = json.dumps([vector['data'], vector['metadata']], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def state_file_for(namespace: str = '') -> str:
+    """Ingestion state file of a namespace; each namespace diffs against its own hashes"""
+    if not namespace:
+        return DEFAULT_STATE_FILE
+    return os.path.join(BASE_DIR, f'.ingest_state.{namespace}.json')
+
+def load_state(state_path: str) -> Dict[str, str]:
+    """Chunk id -> hash of what is currently in the index"""
+    if not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            logger.warning("⚠️ Ingestion state is from another version, starting from scratch")
+            return {}
+        return state.get('chunks', {})
+    except Exception as e:
+        logger.error(f"❌ Could not read ingestion state, starting from scratch: {str(e)}")
+        return {}
+
+def save_state(state_path: str, chunk_hashes: Dict[str, str]) -> None:
+    """Atomically persist progress so an interrupted run can resume"""
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': STATE_VERSION,
+            'updated': datetime.now().isoformat(),
+            'chunks': chunk_hashes,
+        }, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+def plan_ingestion(data: Dict[str, Any], state: Dict[str, str], full: bool = False) -> Dict[str, Any]:
+    """Diff the current chunks against the ingestion state (full re-upserts every chunk)"""
+    vectors = {}
+    for chunk in build_chunks(data):
+        vector = chunk_to_vector(chunk)
+        vectors[vector['id']] = (vector, vector_hash(vector))
+
+    upserts = [(vector, digest) for vector_id, (vector, digest) in vectors.items()
+               if full or state.get(vector_id) != digest]
+    deletes = [vector_id for vector_id in state if vector_id not in vectors]
+    return {
+        'upserts': upserts,
+        'deletes': deletes,
+        'unchanged': len(vectors) - len(upserts),
+    }
+
+def ingest(index: Any, data_path: str = DEFAULT_DATA_FILE, state_path: str = DEFAULT_STATE_FILE,
+           batch_size: int = UPSERT_BATCH_SIZE, full: bool = False, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Sync the twin data into the index; index needs upsert(vectors=) and delete(ids=)
+    Returns counts of upserted, deleted and unchanged chunks
+    """
+    with open(data_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    state = load_state(state_path)
+    plan = plan_ingestion(data, state, full=full)
+    stats = {'upserted': 0, 'deleted': 0, 'unchanged': plan['unchanged']}
+
+    logger.info(f"📋 Ingestion plan: {len(plan['upserts'])} to upsert, "
+                f"{len(plan['deletes'])} to delete, {plan['unchanged']} unchanged")
+    if dry_run:
+        stats.update(upserted=len(plan['upserts']), deleted=len(plan['deletes']))
+        return stats
+
+    for start in range(0, len(plan['upserts']), batch_size):
+        batch = plan['upserts'][start:start + batch_size]
+        index.upsert(vectors=[vector for vector, _ in batch])
+        for vector, digest in batch:
+            state[vector['id']] = digest
+        save_state(state_path, state)
+        stats['upserted'] += len(batch)
+        logger.info(f"✅ Upserted {stats['upserted']}/{len(plan['upserts'])} chunks")
+
+    for start in range(0, len(plan['deletes']), DELETE_BATCH_SIZE):
+        batch = plan['deletes'][start:start + DELETE_BATCH_SIZE]
+        index.delete(ids=batch)
+        for vector_id in batch:
+            state.pop(vector_id, None)
+        save_state(state_path, state)
+        stats['deleted'] += len(batch)
+        logger.info(f"🗑️ Deleted {stats['deleted']}/{len(plan['deletes'])} chunks")
+
+    if not plan['upserts'] and not plan['deletes']:
+        save_state(state_path, state)
+    return stats
+
+def create_write_index() -> Optional[Any]:
+    """Read/write Upstash client from the environment"""
+    from dotenv import load_dotenv
+    from upstash_vector import Index
+
+    load_dotenv()
+    return Index(
+        url=os.getenv("UPSTASH_VECTOR_REST_URL"),
+        token=os.getenv("UPSTASH_VECTOR_REST_TOKEN")
+    )
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Incrementally ingest the digital twin into the vector index")
+    parser.add_argument('--data', default=DEFAULT_DATA_FILE, help="Path to the twin JSON")
+    parser.add_argument('--state', default=None,
+                        help="Ingestion state file (default: one per namespace next to this script)")
+    parser.add_argument('--batch-size', type=int, default=UPSERT_BATCH_SIZE, help="Chunks per upsert request")
+    parser.add_argument('--full', action='store_true', help="Re-upsert every chunk (removed chunks are still deleted)")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+    parser.add_argument('--namespace', default='', help="Upstash namespace; use the twin ID when serving several twins")
+    args = parser.parse_args()
+
+    write_index = None if args.dry_run else create_write_index()
+    if write_index is not None and args.namespace:
+        write_index = NamespacedIndex(write_index, args.namespace)
+    state_path = args.state or state_file_for(args.namespace)
+    stats = ingest(write_index, args.data, state_path,
+                   batch_size=args.batch_size, full=args.full, dry_run=args.dry_run)
+    print(f"📦 Ingestion {'plan' if args.dry_run else 'complete'}: {stats}")
@@ -0,0 +1,121 @@
+"""
+Lexical Index
+Prebuilt tokenized inverted index with BM25 scoring for local (offline) search
+"""
+
+import heapq
+import math
+import re
+import sys
+from collections import Counter
+from typing import List, Dict, Tuple, Optional, Iterable, Any
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Rough CPython sizes for memory_bytes(): a (doc, tf) tuple plus its list slot, and a term's dict entries
+POSTING_BYTES = 64
+TERM_BYTES = 160
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from
+further had has have having he her here hers herself him himself his how i if in into
+is it its itself just me more most my myself no nor not now of off on once only or
+other our ours ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your
+yours yourself yourselves tell describe please give share talk explain
+""".split())
+
+def stem(token: str) -> str:
+    """Very light suffix stripping so 'skills' matches 'skill'"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and stem"""
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """
+    Inverted index over a fixed set of documents
+    Postings map each term to (doc, term frequency) pairs; IDF is precomputed at build time
+    """
+
+    def __init__(self, doc_ids: List[str], doc_types: List[str],
+                 postings: Dict[str, List[Tuple[int, int]]], doc_lengths: List[int]):
+        self.doc_ids = doc_ids
+        self.doc_types = doc_types
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.avg_doc_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+        n_docs = len(doc_ids)
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+        self.posting_count = sum(len(docs) for docs in postings.values())
+        # Length normalisation is constant per document, so compute it once
+        self.length_norms = [
+            BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_doc_length) if self.avg_doc_length else BM25_K1
+            for length in doc_lengths
+        ]
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, str, str]]) -> 'BM25Index':
+        """Build the index from (doc_id, doc_type, text) triples"""
+        doc_ids, doc_types, doc_lengths = [], [], []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for doc_idx, (doc_id, doc_type, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            doc_types.append(doc_type)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                # Interned, so every twin's index in the process shares one copy of each term
+                postings.setdefault(sys.intern(term), []).append((doc_idx, tf))
+
+        return cls(doc_ids, doc_types, postings, doc_lengths)
+
+    def memory_bytes(self) -> int:
+        """Estimated resident size of the postings, IDF table and per-document arrays"""
+        return self.posting_count * POSTING_BYTES + len(self.postings) * TERM_BYTES + len(self.doc_ids) * 64
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form used by the persisted index artifact"""
+        return {
+            'doc_ids': self.doc_ids,
+            'doc_types': self.doc_types,
+            'doc_lengths': self.doc_lengths,
+            'postings': self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'BM25Index':
+        """Rebuild the index from to_dict() output without re-tokenizing"""
+        postings = {sys.intern(term): docs for term, docs in payload['postings'].items()}
+        return cls(payload['doc_ids'], payload['doc_types'], postings, payload['doc_lengths'])
+
+    def search(self, query: str, top_k: int = 5,
+               doc_type: Optional[str] = None) -> List[Tuple[float, int]]:
+        """Return up to top_k (score, doc index) pairs, best first"""
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for doc_idx, tf in docs:
+                if doc_type and self.doc_types[doc_idx] != doc_type:
+                    continue
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + self.length_norms[doc_idx])
+
+        return heapq.nlargest(top_k, ((score, doc_idx) for doc_idx, score in scores.items()))
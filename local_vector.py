@@ -0,0 +1,157 @@
+"""
+Local Vector Index
+CPU-only retriever backend: hashed TF-IDF over words and character n-grams,
+stored in a NumPy matrix and searched with one matmul plus argpartition top-k.
+Exposes the same query() surface as upstash_vector.Index so safe_vector_query
+can use it unchanged with zero network latency and zero query quota.
+"""
+
+import threading
+import zlib
+from typing import List, Dict, Any, Callable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from lexical_index import tokenize
+from twin_chunks import chunk_search_text
+
+VECTOR_DIM = 2 ** 14
+CHAR_NGRAM_SIZES = (3, 4, 5)
+
+class LocalMatch(NamedTuple):
+    """Mirror of upstash_vector.types.QueryResult fields used by the server"""
+    id: str
+    score: float
+    metadata: Optional[Dict[str, Any]]
+
+def hashed_features(text: str) -> List[int]:
+    """Hash word tokens and their character n-grams into feature buckets"""
+    features = []
+    for token in tokenize(text):
+        features.append(zlib.crc32(b'w:' + token.encode('utf-8')) % VECTOR_DIM)
+        padded = f" {token} "
+        for n in CHAR_NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                features.append(zlib.crc32(padded[i:i + n].encode('utf-8')) % VECTOR_DIM)
+    return features
+
+def term_frequencies(texts: List[str]) -> np.ndarray:
+    """Sublinear term-frequency matrix (one row per text)"""
+    matrix = np.zeros((len(texts), VECTOR_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        buckets, counts = np.unique(np.asarray(hashed_features(text), dtype=np.int64), return_counts=True)
+        matrix[row, buckets] = 1.0 + np.log(counts)
+    return matrix
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Normalize rows to unit length so a dot product is cosine similarity"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def compute_vectors(chunks: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Embed chunks into a unit-normalized TF-IDF matrix; returns (matrix, idf)"""
+    tf = term_frequencies([chunk_search_text(chunk) for chunk in chunks])
+    doc_freq = np.count_nonzero(tf, axis=0)
+    idf = (np.log((1 + len(chunks)) / (1 + doc_freq)) + 1.0).astype(np.float32)
+    return l2_normalize(tf * idf), idf
+
+class VectorSnapshot(NamedTuple):
+    """Chunks and their embedding, always published together"""
+    chunks: List[Dict[str, Any]]
+    matrix: np.ndarray
+    idf: np.ndarray
+
+class LocalVectorIndex:
+    """
+    In-process vector index over the twin chunks
+    The matrix is built lazily on first query from chunks_provider(), unless
+    arrays_provider() returns a prebuilt (matrix, idf) pair from the index artifact.
+    Queries read one immutable VectorSnapshot, so a concurrent rebuild or reset never
+    mixes a new matrix with old chunks.
+    """
+
+    def __init__(self, chunks_provider: Callable[[], List[Dict[str, Any]]],
+                 arrays_provider: Optional[Callable[[], Optional[Tuple[np.ndarray, np.ndarray]]]] = None):
+        self.chunks_provider = chunks_provider
+        self.arrays_provider = arrays_provider
+        self._lock = threading.Lock()
+        self._snapshot: Optional[VectorSnapshot] = None
+
+    def build(self) -> VectorSnapshot:
+        """Embed every chunk into the (n_chunks, VECTOR_DIM) matrix and publish it"""
+        with self._lock:
+            return self._build_locked()
+
+    def _build_locked(self) -> VectorSnapshot:
+        chunks = self.chunks_provider()
+        prebuilt = self.arrays_provider() if self.arrays_provider else None
+        matrix, idf = prebuilt if prebuilt is not None else compute_vectors(chunks)
+        snapshot = VectorSnapshot(chunks, matrix, idf)
+        self._snapshot = snapshot
+        return snapshot
+
+    def reset(self) -> None:
+        """Forget the current matrix so the next query rebuilds it (e.g. after a data edit)"""
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot(self) -> VectorSnapshot:
+        """The published snapshot, built on first use"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            return self._snapshot or self._build_locked()
+
+    def memory_bytes(self) -> int:
+        """Size of the built matrix and IDF vector (0 until the first query builds them)"""
+        snapshot = self._snapshot
+        return 0 if snapshot is None else int(snapshot.matrix.nbytes + snapshot.idf.nbytes)
+
+    def embed(self, texts: List[str], snapshot: Optional[VectorSnapshot] = None) -> np.ndarray:
+        """Embed query texts with the corpus IDF weights"""
+        snapshot = snapshot or self.snapshot()
+        return l2_normalize(term_frequencies(texts) * snapshot.idf)
+
+    @staticmethod
+    def _top_k(snapshot: VectorSnapshot, scores: np.ndarray, top_k: int,
+               include_metadata: bool) -> List[LocalMatch]:
+        top_k = min(top_k, scores.shape[0])
+        if top_k <= 0:
+            return []
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        chunks = snapshot.chunks
+        # Report scores like Upstash does for cosine indexes: (1 + cosine) / 2
+        # Metadata is the chunk dict itself (with its 'id'), shared read-only rather than copied per hit
+        return [
+            LocalMatch(
+                id=chunks[i]['id'],
+                score=float((1.0 + scores[i]) / 2.0),
+                metadata=chunks[i] if include_metadata else None
+            )
+            for i in ranked
+        ]
+
+    def query(self, data: str = '', top_k: int = 10, include_metadata: bool = False,
+              **kwargs: Any) -> List[LocalMatch]:
+        """Same call shape as upstash_vector.Index.query for raw-text queries"""
+        snapshot = self.snapshot()
+        query_vector = self.embed([data], snapshot)[0]
+        if not query_vector.any():
+            return []
+        return self._top_k(snapshot, snapshot.matrix @ query_vector, top_k, include_metadata)
+
+    def query_many(self, queries: List[Dict[str, Any]], **kwargs: Any) -> List[List[LocalMatch]]:
+        """Same call shape as upstash_vector.Index.query_many; one matmul for the whole batch"""
+        if not queries:
+            return []
+        snapshot = self.snapshot()
+        query_matrix = self.embed([query.get('data', '') for query in queries], snapshot)
+        scores = query_matrix @ snapshot.matrix.T
+        return [
+            self._top_k(snapshot, scores[row], query.get('top_k', 10), query.get('include_metadata', False))
+            if query_matrix[row].any() else []
+            for row, query in enumerate(queries)
+        ]
@@ -0,0 +1,143 @@
+"""
+Logging Setup
+Entry-point logging configuration: records are handed to a bounded queue on the request
+thread (never blocking; overflow is counted and dropped) and formatted and written by a
+background listener, as text or one JSON object per line. High-volume events are sampled
+before they reach the queue.
+
+    LOG_FORMAT=json LOG_LEVEL=INFO LOG_SAMPLE_RATE=0.01 python server.py
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from metrics import current_trace
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # 'text' or 'json'
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() != "false"
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))  # Share of sampled events kept
+LOG_QUEUE_SIZE = 10000
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via extra= and is a structured field
+STANDARD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+def log_fields(event: str, sampled: bool = False, **fields: Any) -> Dict[str, Any]:
+    """
+    extra= payload for a structured log call, e.g.
+    logger.info("Vector query returned %d results", n, extra=log_fields('vector_query', sampled=True, results=n))
+    """
+    return {'event': event, 'sampled': sampled, **fields}
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in every round(1 / rate) records marked sampled=True, counted per event"""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'sampled', False):
+            return True
+        if not self.every:
+            return False
+        event = getattr(record, 'event', record.name)
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        if count % self.every:
+            return False
+        record.sample_rate = 1 / self.every
+        return True
+
+class TraceContextFilter(logging.Filter):
+    """Stamps the active request trace id while still on the request thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = current_trace()
+        if trace is not None:
+            record.trace_id = trace.trace_id
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra= fields become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES and key != 'sampled':
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that defers all formatting to the listener thread and drops
+    (and counts) records instead of blocking when the queue is full
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same-process queue: no need to pre-format or make the record picklable
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+_configured = False
+_configure_lock = threading.Lock()
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, async_mode: bool = LOG_ASYNC,
+                      sample_rate: float = LOG_SAMPLE_RATE) -> None:
+    """Install the root handler once; later calls (e.g. from several entry points) are no-ops"""
+    global _listener, _configured
+    root = logging.getLogger()
+    with _configure_lock:
+        if _configured:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        if async_mode:
+            handler: logging.Handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+            _listener = QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+            _listener.start()
+            # Flush what is still queued on interpreter exit
+            atexit.register(_listener.stop)
+        else:
+            handler = stream_handler
+        handler.addFilter(SamplingFilter(sample_rate))
+        handler.addFilter(TraceContextFilter())
+
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+        _configured = True
@@ -0,0 +1,97 @@
+"""
+Interview Q&A Answer Table
+Precompiled lookup from the curated interview_qa questions to their ready-made answers:
+exact match on the normalized question, then near-matches by trigram Jaccard similarity
+through a trigram inverted index, provided both agree on negation, comparison and time
+words (response_cache.polarity_terms). The questions' keyword lists are not matched on: a short
+topic phrase says too little about which curated answer is meant, so it goes to retrieval.
+"""
+
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from response_cache import normalize_query, polarity_terms, shingles
+
+QA_MATCH_THRESHOLD = 0.6  # Minimum trigram Jaccard for a near-match
+# Rough CPython sizes for memory_bytes(): a trigram's dict entry and string, and one posting slot
+SHINGLE_BYTES = 150
+POSTING_BYTES = 36
+
+class QAAnswer(NamedTuple):
+    """Ready-made answer payload for one curated question"""
+    id: str
+    question: str
+    answer: str
+    category: str
+
+class QAMatch(NamedTuple):
+    answer: QAAnswer
+    match: str          # 'exact' or 'near'
+    similarity: float
+
+class QAAnswerTable:
+    """Built once per twin data load; lookups are dict probes plus a few set intersections"""
+
+    def __init__(self, answers: List[QAAnswer], similarity_threshold: float = QA_MATCH_THRESHOLD):
+        self.answers = answers
+        self.similarity_threshold = similarity_threshold
+        self.exact: Dict[str, int] = {}
+        self.shingle_counts: List[int] = []
+        self.polarities: List[FrozenSet[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+
+    @classmethod
+    def build(cls, chunks: List[Dict[str, Any]],
+              similarity_threshold: float = QA_MATCH_THRESHOLD) -> 'QAAnswerTable':
+        """Index the interview_qa chunks (see twin_chunks.build_chunks)"""
+        qa_chunks = [chunk for chunk in chunks if chunk.get('type') == 'interview_qa' and chunk.get('question')]
+        table = cls([
+            QAAnswer(chunk['id'], chunk['question'], chunk.get('answer', ''), chunk.get('category', 'general'))
+            for chunk in qa_chunks
+        ], similarity_threshold)
+
+        for position, chunk in enumerate(qa_chunks):
+            key = normalize_query(chunk['question'])
+            table.exact.setdefault(key, position)
+            question_shingles = shingles(key)
+            table.shingle_counts.append(len(question_shingles))
+            table.polarities.append(polarity_terms(key))
+            for shingle in question_shingles:
+                table.postings.setdefault(shingle, []).append(position)
+        return table
+
+    def lookup(self, query: str) -> Optional[QAMatch]:
+        """Best curated answer for the query, or None when nothing matches closely enough"""
+        key = normalize_query(query)
+        if not key:
+            return None
+
+        position = self.exact.get(key)
+        if position is not None:
+            return QAMatch(self.answers[position], 'exact', 1.0)
+
+        query_shingles = shingles(key)
+        polarity = polarity_terms(key)
+        overlaps: Dict[int, int] = {}
+        for shingle in query_shingles:
+            for position in self.postings.get(shingle, ()):
+                overlaps[position] = overlaps.get(position, 0) + 1
+        # 'have you not worked with' must not get the 'have worked with' answer
+        overlaps = {position: overlap for position, overlap in overlaps.items()
+                    if self.polarities[position] == polarity}
+        best: Optional[Tuple[float, int]] = None
+        for position, overlap in overlaps.items():
+            similarity = overlap / (len(query_shingles) + self.shingle_counts[position] - overlap)
+            if best is None or similarity > best[0]:
+                best = (similarity, position)
+        if best is not None and best[0] >= self.similarity_threshold:
+            return QAMatch(self.answers[best[1]], 'near', round(best[0], 3))
+        return None
+
+    def memory_bytes(self) -> int:
+        """Estimated resident size of the trigram index and answer texts"""
+        postings = sum(len(positions) for positions in self.postings.values())
+        texts = sum(len(answer.question) + len(answer.answer) for answer in self.answers)
+        return len(self.postings) * SHINGLE_BYTES + postings * POSTING_BYTES + texts + len(self.answers) * 200
+
+    def __len__(self) -> int:
+        return len(self.answers)
@@ -0,0 +1,77 @@
+"""
+Query Intent Classifier
+One compiled, longest-first keyword regex scanned once over the query; each matched
+keyword maps to the intents it signals. Keywords match whole words (plus a plural
+'s'/'es'); only explicit stems ending in '*' (like 'competenc*') match as word prefixes.
+Shared by the retrieval planner and the HTTP entry point's canned answers, and
+cheap enough (stdlib only) to import on a cold start.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, NamedTuple, Tuple
+
+from lexical_index import STOPWORDS
+
+# intent -> keywords; 'skill' also catches 'skills', 'competenc*' catches 'competency' and 'competencies'
+INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'personal': ('name', 'contact', 'location', 'located', 'where are you', 'email', 'phone', 'linkedin',
+                 'summary', 'about', 'who are you'),
+    'name': ('name', 'who are you'),
+    'summary': ('summary', 'about'),
+    'experience': ('experience', 'experienced', 'work', 'worked', 'working', 'job', 'role', 'position',
+                   'career', 'compan*', 'employer', 'asurion', 'etisalat', 'project'),
+    'skills': ('skill', 'skillset', 'competenc*', 'abilit*', 'strength', 'expertise', 'tool', 'methodolog*',
+               'framework', 'technique', 'proficien*', 'certif*'),
+    'achievement': ('achievement', 'award', 'accomplish*', 'proud', 'recogni*'),
+    'behavioural': ('how do you', 'how would you', 'how did you', 'a time when', 'a time you',
+                    'give me an example', 'an example of', 'approach', 'handl*', 'deal with', 'why'),
+}
+
+STEM_MARKER = '*'
+WORD_PATTERN = re.compile(r'[a-z0-9]+', re.IGNORECASE)
+
+def _keyword_pattern(keyword: str) -> str:
+    if keyword.endswith(STEM_MARKER):
+        return re.escape(keyword[:-1])
+    # The lookahead keeps the match itself equal to the keyword, so it maps straight back
+    return re.escape(keyword) + r'(?=(?:e?s)?\b)'
+
+def _compile(intent_keywords: Dict[str, Tuple[str, ...]]) -> Tuple[re.Pattern, Dict[str, FrozenSet[str]]]:
+    keyword_intents: Dict[str, set] = {}
+    for intent, keywords in intent_keywords.items():
+        for keyword in keywords:
+            keyword_intents.setdefault(keyword, set()).add(intent)
+    # Longest first, so 'who are you' wins over any shorter keyword starting at the same place
+    alternation = '|'.join(_keyword_pattern(keyword)
+                           for keyword in sorted(keyword_intents, key=len, reverse=True))
+    return (re.compile(r'\b(?:' + alternation + ')', re.IGNORECASE),
+            {keyword.rstrip(STEM_MARKER): frozenset(intents) for keyword, intents in keyword_intents.items()})
+
+KEYWORD_PATTERN, KEYWORD_INTENTS = _compile(INTENT_KEYWORDS)
+
+class QueryIntent(NamedTuple):
+    intents: FrozenSet[str]
+    coverage: float = 0.0  # Share of the query's content words that are intent keywords
+
+    def has(self, intent: str) -> bool:
+        return intent in self.intents
+
+    @property
+    def signature(self) -> str:
+        """Stable short string of the intents, e.g. for cache keys"""
+        return ','.join(sorted(self.intents))
+
+@lru_cache(maxsize=1024)
+def classify_query(query: str) -> QueryIntent:
+    """Intents signalled by the query's keywords (empty for an unrecognized question)"""
+    intents: FrozenSet[str] = frozenset()
+    spans = []
+    for match in KEYWORD_PATTERN.finditer(query):
+        intents |= KEYWORD_INTENTS[match.group().lower()]
+        spans.append(match.span())
+
+    content_words = [word.start() for word in WORD_PATTERN.finditer(query)
+                     if word.group().lower() not in STOPWORDS]
+    covered = sum(1 for start in content_words if any(begin <= start < end for begin, end in spans))
+    return QueryIntent(intents, covered / len(content_words) if content_words else 0.0)
@@ -0,0 +1,23 @@
+"""
+Rank Fusion
+Reciprocal-rank fusion (Cormack et al., 2009) for merging ranked result lists from
+retrievers whose scores are not comparable, e.g. vector cosine and BM25.
+"""
+
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+RRF_K = 60  # Damps the advantage of the very top ranks; 60 is the value from the paper
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K,
+                           weights: Sequence[float] = ()) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse ranked id lists into one ranking by sum(weight / (k + rank)), rank starting at 1
+    Ties keep the order in which ids were first seen (earlier rankings first)
+    """
+    scores: Dict[Hashable, float] = {}
+    for position, ranking in enumerate(rankings):
+        weight = weights[position] if position < len(weights) else 1.0
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    # sorted() is stable, so equal scores stay in first-seen order
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
@@ -0,0 +1,279 @@
+"""
+Response Cache
+Thread-safe TTL + LRU cache for formatted answers with invalidation and hit/miss/eviction counters,
+plus a semantic front-end that normalizes queries and serves near-duplicate paraphrases
+"""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Set, Tuple
+
+from lexical_index import STOPWORDS, TOKEN_PATTERN, stem
+
+# MinHash LSH parameters: NUM_PERM = BANDS * ROWS
+MINHASH_BANDS = 8
+MINHASH_ROWS = 4
+MINHASH_PRIME = (1 << 61) - 1
+MINHASH_SEEDS = [
+    ((i * 0x9E3779B1 + 1) % MINHASH_PRIME, (i * 0x85EBCA77 + 7) % MINHASH_PRIME)
+    for i in range(1, MINHASH_BANDS * MINHASH_ROWS + 1)
+]
+
+# BM25 stopwords that still change what a question asks: negation, comparison and time
+MEANINGFUL_STOPWORDS = frozenset("""
+no nor not more most few than only same other above below over under
+before after during until now then once again
+""".split())
+CACHE_STOPWORDS = STOPWORDS - MEANINGFUL_STOPWORDS
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after ttl seconds
+    Expired entries are dropped lazily on access; the least recently used entry is evicted when full
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, record_stats: bool = True) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if record_stats:
+                    self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                if record_stats:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if record_stats:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or refresh an entry, evicting the least recently used one when full"""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every entry whose key matches the predicate"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache against production traffic"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+def normalize_query(query: str) -> str:
+    """
+    Case-, punctuation-, stopword- and word-order-insensitive form of a query
+    Keeps MEANINGFUL_STOPWORDS so e.g. 'not' questions never share a key with their opposite
+    """
+    return ' '.join(sorted({stem(token) for token in TOKEN_PATTERN.findall(query.lower())
+                            if token not in CACHE_STOPWORDS}))
+
+def polarity_terms(normalized: str) -> FrozenSet[str]:
+    """The MEANINGFUL_STOPWORDS of a normalized query; near-matches must agree on them"""
+    return frozenset(term for term in normalized.split() if term in MEANINGFUL_STOPWORDS)
+
+def shingles(text: str, size: int = 3) -> FrozenSet[str]:
+    """Character shingles of a normalized query"""
+    padded = f" {text} "
+    return frozenset(padded[i:i + size] for i in range(max(1, len(padded) - size + 1)))
+
+def minhash_bands(shingle_set: FrozenSet[str]) -> List[int]:
+    """MinHash signature folded into one hash per LSH band"""
+    hashed = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingle_set]
+    signature = [min((a * x + b) % MINHASH_PRIME for x in hashed) for a, b in MINHASH_SEEDS]
+    return [
+        hash(tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]))
+        for band in range(MINHASH_BANDS)
+    ]
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Exact Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class SemanticQueryCache:
+    """
+    Two-tier answer cache in front of TTLCache
+    Tier 1 keys on the normalized query; tier 2 finds near-duplicate cached queries via
+    MinHash LSH and accepts the best one whose exact Jaccard similarity meets the threshold.
+    The variant string partitions the cache for queries whose answers differ despite similar words;
+    LSH buckets are further split by polarity_terms, so 'not' never near-matches its opposite.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600.0, similarity_threshold: float = 0.8):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._shingles: Dict[Tuple[str, str], FrozenSet[str]] = {}
+        self._buckets: Dict[Tuple[str, FrozenSet[str], int, int], Set[Tuple[str, str]]] = {}
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def make_key(self, query: str, variant: str = '') -> Tuple[str, str]:
+        """Cache key; falls back to the lowercased text when the query is all stopwords"""
+        return (variant, normalize_query(query) or ' '.join(TOKEN_PATTERN.findall(query.lower())))
+
+    def get(self, query: str, variant: str = '') -> Optional[Any]:
+        """Return a cached answer for the query or a near-duplicate of it, else None"""
+        key = self.make_key(query, variant)
+        value = self.cache.get(key, record_stats=False)
+        if value is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return value
+
+        if self.similarity_threshold < 1.0:
+            value = self._near_duplicate(key)
+            if value is not None:
+                with self._lock:
+                    self.near_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    @staticmethod
+    def _bucket_keys(key: Tuple[str, str], key_shingles: FrozenSet[str]) -> List[Tuple[str, FrozenSet[str], int, int]]:
+        """LSH buckets of a key: one per band, scoped to its variant and polarity terms"""
+        polarity = polarity_terms(key[1])
+        return [(key[0], polarity, band, band_hash) for band, band_hash in enumerate(minhash_bands(key_shingles))]
+
+    def _near_duplicate(self, key: Tuple[str, str]) -> Optional[Any]:
+        query_shingles = shingles(key[1])
+        with self._lock:
+            candidates = set()
+            for bucket_key in self._bucket_keys(key, query_shingles):
+                candidates.update(self._buckets.get(bucket_key, ()))
+            scored = sorted(
+                ((jaccard(query_shingles, self._shingles[candidate]), candidate) for candidate in candidates),
+                reverse=True
+            )
+
+        for similarity, candidate in scored:
+            if similarity < self.similarity_threshold:
+                break
+            value = self.cache.get(candidate, record_stats=False)
+            if value is not None:
+                return value
+            self._forget(candidate)
+        return None
+
+    def set(self, query: str, value: Any, variant: str = '') -> None:
+        """Cache an answer and register its key for near-duplicate lookup"""
+        key = self.make_key(query, variant)
+        self.cache.set(key, value)
+        key_shingles = shingles(key[1])
+        with self._lock:
+            if key not in self._shingles:
+                self._shingles[key] = key_shingles
+                for bucket_key in self._bucket_keys(key, key_shingles):
+                    self._buckets.setdefault(bucket_key, set()).add(key)
+            # Keys evicted from the TTL cache are pruned lazily; bound the leftovers
+            if len(self._shingles) > 2 * self.cache.maxsize:
+                for stale in [k for k in self._shingles if k not in self.cache]:
+                    self._forget_locked(stale)
+
+    def _forget(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._forget_locked(key)
+
+    def _forget_locked(self, key: Tuple[str, str]) -> None:
+        key_shingles = self._shingles.pop(key, None)
+        if key_shingles is None:
+            return
+        for bucket_key in self._bucket_keys(key, key_shingles):
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[bucket_key]
+
+    def invalidate(self, variant_matches: Optional[Callable[[str], bool]] = None) -> None:
+        """Drop every cached answer, or only those whose variant matches"""
+        if variant_matches is None:
+            self.cache.invalidate()
+            with self._lock:
+                self._shingles.clear()
+                self._buckets.clear()
+            return
+        self.cache.invalidate_where(lambda key: variant_matches(key[0]))
+        with self._lock:
+            for key in [key for key in self._shingles if variant_matches(key[0])]:
+                self._forget_locked(key)
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def stats(self) -> Dict[str, Any]:
+        """TTL cache counters plus exact/near-duplicate hit breakdown"""
+        stats = self.cache.stats()
+        with self._lock:
+            exact_hits, near_hits, misses = self.exact_hits, self.near_hits, self.misses
+        lookups = exact_hits + near_hits + misses
+        stats.update({
+            'hits': exact_hits + near_hits,
+            'exact_hits': exact_hits,
+            'near_duplicate_hits': near_hits,
+            'misses': misses,
+            'hit_ratio': round((exact_hits + near_hits) / lookups, 4) if lookups else 0.0,
+            'similarity_threshold': self.similarity_threshold,
+        })
+        return stats
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Production HTTP Server
+Serves the same routes as index.py's handler (/health, /api/test, /api/query) with
+HTTP/1.1 keep-alive, a bound on concurrently running requests, socket timeouts and 429 backpressure.
+
+Run standalone (outside Vercel):
+    PORT=8000 MAX_WORKERS=256 python server.py
+"""
+
+import json
+import logging
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+from index import PREWARM_RETRIEVAL, handler, prewarm_retrieval
+from logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Server configuration
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "256"))  # Requests being processed at once
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))  # Socket read/idle timeout
+LISTEN_BACKLOG = 512
+MAX_DRAIN_BYTES = 1024 * 1024  # Larger bodies of rejected requests are not read; the connection is just closed
+
+REJECT_BODY = json.dumps({'error': 'Server busy', 'message': 'Too many concurrent requests, please retry shortly'}).encode('utf-8')
+
+class KeepAliveHandler(handler):
+    """index.handler speaking HTTP/1.1 so clients can reuse connections"""
+    protocol_version = 'HTTP/1.1'
+    # Applied to the socket: bounds slow request reads and idle keep-alive connections
+    timeout = REQUEST_TIMEOUT_SECONDS
+    # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls on reused sockets
+    disable_nagle_algorithm = True
+
+    def handle_one_request(self):
+        # A worker slot covers one request, never the idle time of a keep-alive connection
+        self.holds_slot = False
+        try:
+            super().handle_one_request()
+        finally:
+            if self.holds_slot:
+                self.server.worker_slots.release()
+
+    def parse_request(self):
+        if not super().parse_request():
+            return False
+        if not self.server.worker_slots.acquire(blocking=False):
+            self.reject_busy()
+            return False
+        self.holds_slot = True
+        return True
+
+    def reject_busy(self):
+        """429 the parsed request, reading its body first so the client sees the response, not a reset"""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = 0
+        if 0 < length <= MAX_DRAIN_BYTES:
+            self.rfile.read(length)
+        self.send_body(REJECT_BODY, 429, headers={'Retry-After': '1', 'Connection': 'close'})
+        self.close_connection = True
+
+class BoundedThreadingHTTPServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that runs at most max_workers requests at once
+    Each connection gets a thread; requests beyond max_workers are answered immediately
+    with 429 instead of queueing, while idle keep-alive connections hold no slot
+    """
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, server_address, handler_class, max_workers: int = MAX_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.max_workers = max_workers
+        self.worker_slots = threading.BoundedSemaphore(max_workers)
+
+def create_server(host: str = HOST, port: int = PORT, max_workers: int = MAX_WORKERS) -> BoundedThreadingHTTPServer:
+    """Build (but do not start) the production server"""
+    return BoundedThreadingHTTPServer((host, port), KeepAliveHandler, max_workers=max_workers)
+
+if __name__ == "__main__":
+    configure_logging()
+    server = create_server()
+    if not PREWARM_RETRIEVAL:
+        # Long-lived process: warm retrieval while waiting for the first request
+        prewarm_retrieval()
+    logger.info(f"🚀 Digital Twin API listening on http://{HOST}:{PORT} "
+                f"(workers={MAX_WORKERS}, timeout={REQUEST_TIMEOUT_SECONDS}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
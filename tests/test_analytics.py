@@ -0,0 +1,17 @@
+from analytics import AnalyticsRollup, ChatEvent, aggregate_questions
+
+def event(query, twin_id, response_time=0.1):
+    return ChatEvent(query, 'answer', response_time, None, 'skills', 1_700_000_000.0, None, None, 'mcp', twin_id)
+
+def test_rollups_are_kept_per_twin():
+    rollup = AnalyticsRollup()
+    events = [event("What are your skills?", 'default'), event("What are your skills?", 'acme', 0.3),
+              event("what are your skills", 'acme', 0.5)]
+    rollup.merge(events, aggregate_questions(events))
+
+    twins = rollup.snapshot()['twins']
+
+    assert twins['default']['popular'][0]['ask_count'] == 1
+    assert twins['acme']['popular'][0]['ask_count'] == 2
+    assert twins['acme']['categories']['skills'] == {'count': 2, 'avg_response_time': 0.4}
+    assert twins['default']['latency']['total'] == 1
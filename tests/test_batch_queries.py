@@ -0,0 +1,49 @@
+import threading
+import time
+
+import digital_twin_mcp_server_optimized as retrieval
+
+def test_batch_occupies_at_most_bulk_max_search_workers(monkeypatch):
+    lock = threading.Lock()
+    running = {'now': 0, 'peak': 0}
+
+    def answer_query_group(queries):
+        with lock:
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+        time.sleep(0.01)
+        with lock:
+            running['now'] -= 1
+        return [f"answer to {query}" for query in queries]
+
+    monkeypatch.setattr(retrieval, 'answer_query_group', answer_query_group)
+    monkeypatch.setattr(retrieval, 'BULK_MAX_SEARCH_WORKERS', 2)
+    queries = [f"What did you learn from project number {i}?" for i in range(10 * retrieval.BULK_QUERY_GROUP_SIZE)]
+
+    answers = retrieval.mcp_answer_queries(queries)
+
+    assert running['peak'] == 2
+    assert [answer['content'] for answer in answers] == [f"answer to {query}" for query in queries]
+
+def test_failed_group_answers_only_its_own_questions_with_an_error(monkeypatch):
+    def answer_query_group(queries):
+        if any('broken' in query for query in queries):
+            raise RuntimeError("vector outage")
+        return [f"answer to {query}" for query in queries]
+
+    monkeypatch.setattr(retrieval, 'answer_query_group', answer_query_group)
+    monkeypatch.setattr(retrieval, 'BULK_QUERY_GROUP_SIZE', 1)
+    answers = retrieval.mcp_answer_queries(["What is your broken question?", "What is your working question?"])
+
+    assert answers[0]['metadata']['error'] == 'vector outage'
+    assert answers[1]['content'] == "answer to What is your working question?"
+
+def test_batch_answers_are_recorded_as_chat_events(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(retrieval, 'answer_query_group', lambda queries: [f"answer to {query}" for query in queries])
+    monkeypatch.setattr(retrieval, 'record_chat', lambda query, response, *args, **kwargs: recorded.append((query, response)))
+
+    retrieval.mcp_answer_queries(["What did you deliver at your last project?", "   "])
+
+    assert recorded == [("What did you deliver at your last project?",
+                         "answer to What did you deliver at your last project?")]
@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import digital_twin_mcp_server_optimized as retrieval
+from fake_index import FakeIndex
+from ingest import chunk_to_vector
+from twin_chunks import build_chunks
+
+@pytest.fixture
+def fake_vector_index():
+    saved = dict(retrieval._vector_state)
+    fake = FakeIndex(latency=0.02)
+    fake.upsert([chunk_to_vector(chunk) for chunk in build_chunks(retrieval.load_digital_twin_data())])
+    retrieval.set_vector_index(fake)
+    yield fake
+    retrieval._vector_state.update(saved)
+
+def test_unbatched_hybrid_search_under_concurrency_is_not_degraded(fake_vector_index):
+    # More concurrent requests than search workers, each fanning out one task per section
+    queries = [f"Tell me about your stakeholder management and agile delivery ({i})"
+               for i in range(2 * retrieval.SEARCH_WORKERS)]
+
+    def search(query):
+        return retrieval.comprehensive_search(query, parallel=True, batched=False, hybrid=True)
+
+    with ThreadPoolExecutor(max_workers=len(queries)) as clients:
+        results = list(clients.map(search, queries))
+
+    assert not [result['query'] for result in results if result['degraded']]
+    assert fake_vector_index.query_calls >= len(queries)
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from fake_index import FakeIndex
+from ingest import ingest, load_state
+
+TWIN = {
+    'personalInfo': {
+        'name': 'Test Twin',
+        'title': 'Programme Manager',
+        'core_competencies': {
+            'stakeholder_management': 'Aligning executives and delivery teams',
+            'agile_delivery': 'Scrum and Kanban at scale',
+        },
+    },
+    'professional_experience': [
+        {'company': 'Acme', 'position': 'Lead', 'duration': '2020-2023',
+         'description': 'Ran the platform programme', 'achievements': ['Key result: 30% faster releases']},
+    ],
+    'interview_qa': {
+        'behavioural': [
+            {'question': 'How do you handle conflict?', 'answer': 'I listen first.'},
+            {'question': 'Why this role?', 'answer': 'It fits my experience.'},
+        ],
+    },
+}
+
+class FlakyIndex(FakeIndex):
+    """FakeIndex whose upserts start failing after a number of successful calls"""
+
+    def __init__(self, fail_after: int):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def upsert(self, vectors, namespace=''):
+        if self.upsert_calls >= self.fail_after:
+            raise ConnectionError("Injected upsert failure")
+        return super().upsert(vectors, namespace)
+
+@pytest.fixture
+def paths(tmp_path):
+    data_path = tmp_path / 'twin.json'
+    data_path.write_text(json.dumps(TWIN), encoding='utf-8')
+    return str(data_path), str(tmp_path / 'state.json')
+
+def write_twin(data_path, data):
+    with open(data_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+def stored(index):
+    return index.namespaces['']
+
+def test_first_run_upserts_every_chunk_in_batches(paths):
+    data_path, state_path = paths
+    index = FakeIndex()
+
+    stats = ingest(index, data_path, state_path, batch_size=2)
+
+    assert stats['upserted'] == len(stored(index)) == len(load_state(state_path))
+    assert stats['deleted'] == stats['unchanged'] == 0
+    assert index.upsert_calls == -(-stats['upserted'] // 2)
+    assert stored(index)['personal-info']['metadata']['name'] == 'Test Twin'
+
+def test_rerun_without_changes_is_a_no_op(paths):
+    data_path, state_path = paths
+    index = FakeIndex()
+    first = ingest(index, data_path, state_path)
+    calls = index.upsert_calls
+
+    stats = ingest(index, data_path, state_path)
+
+    assert stats == {'upserted': 0, 'deleted': 0, 'unchanged': first['upserted']}
+    assert index.upsert_calls == calls
+    assert index.delete_calls == 0
+
+def test_edited_chunk_is_the_only_upsert(paths):
+    data_path, state_path = paths
+    index = FakeIndex()
+    first = ingest(index, data_path, state_path)
+
+    edited = json.loads(json.dumps(TWIN))
+    edited['interview_qa']['behavioural'][0]['answer'] = 'I listen first, then decide.'
+    write_twin(data_path, edited)
+    stats = ingest(index, data_path, state_path)
+
+    assert stats == {'upserted': 1, 'deleted': 0, 'unchanged': first['upserted'] - 1}
+    assert stored(index)['qa-behavioural-0']['metadata']['answer'] == 'I listen first, then decide.'
+
+def test_removed_chunk_is_deleted(paths):
+    data_path, state_path = paths
+    index = FakeIndex()
+    first = ingest(index, data_path, state_path)
+
+    trimmed = json.loads(json.dumps(TWIN))
+    del trimmed['personalInfo']['core_competencies']['agile_delivery']
+    write_twin(data_path, trimmed)
+    stats = ingest(index, data_path, state_path)
+
+    assert stats == {'upserted': 0, 'deleted': 1, 'unchanged': first['upserted'] - 1}
+    assert 'skill-agile-delivery' not in stored(index)
+    assert 'skill-agile-delivery' not in load_state(state_path)
+
+def test_interrupted_run_resumes_from_the_state_file(paths):
+    data_path, state_path = paths
+    flaky = FlakyIndex(fail_after=1)
+    with pytest.raises(ConnectionError):
+        ingest(flaky, data_path, state_path, batch_size=2)
+    assert set(load_state(state_path)) == set(stored(flaky))
+    assert len(stored(flaky)) == 2
+
+    resumed = FakeIndex()
+    stats = ingest(resumed, data_path, state_path, batch_size=2)
+
+    assert stats['unchanged'] == 2
+    assert set(stored(resumed)).isdisjoint(stored(flaky))
+    assert set(load_state(state_path)) == set(stored(flaky)) | set(stored(resumed))
@@ -0,0 +1,34 @@
+from qa_lookup import QAAnswerTable
+
+CHUNKS = [
+    {'id': 'qa-achievements-0', 'type': 'interview_qa', 'category': 'achievements',
+     'question': 'What is your biggest professional achievement?',
+     'answer': 'Leading the billing migration at Etisalat.',
+     'keywords': ['change management', 'achievement']},
+    {'id': 'qa-behavioural-0', 'type': 'interview_qa', 'category': 'behavioural',
+     'question': 'How do you handle conflict in a team?',
+     'answer': 'I listen first.', 'keywords': ['conflict resolution']},
+]
+
+def test_curated_question_matches_exactly_and_nearly():
+    table = QAAnswerTable.build(CHUNKS)
+
+    assert table.lookup('what is your biggest professional achievement').match == 'exact'
+    near = table.lookup('How do you handle conflict within teams?')
+    assert near.match == 'near' and near.answer.id == 'qa-behavioural-0'
+
+def test_topic_keywords_alone_do_not_pick_a_canned_answer():
+    table = QAAnswerTable.build(CHUNKS)
+
+    assert table.lookup('change management') is None
+    assert table.lookup('conflict resolution') is None
+
+def test_near_match_with_different_negation_is_rejected():
+    table = QAAnswerTable.build(CHUNKS + [
+        {'id': 'qa-technical-0', 'type': 'interview_qa', 'category': 'technical',
+         'question': 'What help desk systems have you worked with?',
+         'answer': 'ServiceNow and Jira Service Management.', 'keywords': []},
+    ])
+
+    assert table.lookup('What help desk systems have you worked with daily?').answer.id == 'qa-technical-0'
+    assert table.lookup('What help desk systems have you not worked with?') is None
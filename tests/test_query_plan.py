@@ -0,0 +1,32 @@
+import digital_twin_mcp_server_optimized as retrieval
+from query_intent import classify_query
+
+ALL_SECTIONS = {'experiences', 'skills', 'qa'}
+
+def test_keywords_match_whole_words_not_prefixes():
+    assert not classify_query("Do you facilitate workshops?").intents
+    assert not classify_query("Who named the workflow?").has('name')
+    assert classify_query("Where have you worked?").has('experience')
+    assert classify_query("What are your skills?").has('skills')
+
+def test_explicit_stems_match_word_prefixes():
+    assert classify_query("What are your core competencies?").has('skills')
+    assert classify_query("Which companies have you been with?").has('experience')
+
+def test_strong_intent_plans_only_its_sections():
+    plan = retrieval.plan_query("Tell me about your experience")
+
+    assert plan.sections == {'experiences': 2, 'personal_info': 1}
+
+def test_unrecognized_question_searches_every_section():
+    plan = retrieval.plan_query("Do you facilitate workshops?")
+
+    assert set(plan.sections) == ALL_SECTIONS
+
+def test_weak_intent_match_falls_back_to_every_section():
+    intent = classify_query("What workflow tools do you use for stakeholder requirements?")
+    assert intent.has('skills') and intent.coverage < retrieval.QUERY_PLAN_MIN_COVERAGE
+
+    plan = retrieval.plan_query("What workflow tools do you use for stakeholder requirements?")
+
+    assert set(plan.sections) == ALL_SECTIONS
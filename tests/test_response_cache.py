@@ -0,0 +1,39 @@
+from response_cache import SemanticQueryCache, normalize_query
+
+def test_normalize_query_ignores_case_punctuation_stopwords_and_order():
+    assert normalize_query("What are your Python skills?") == normalize_query("skills in python, please")
+
+def test_normalize_query_keeps_negation_comparison_and_time():
+    assert normalize_query("Do you have Python skills?") != normalize_query("Do you not have Python skills?")
+    assert normalize_query("What did you do before Asurion?") != normalize_query("What did you do after Asurion?")
+    assert normalize_query("Which skill do you use more?") != normalize_query("Which skill do you use most?")
+
+def test_negated_question_is_not_served_from_cache():
+    cache = SemanticQueryCache()
+    cache.set("Do you have Python skills?", 'yes')
+
+    assert cache.get("Do you have python skills") == 'yes'
+    assert cache.get("Do you not have Python skills?") is None
+
+def test_long_negated_question_is_not_served_as_a_near_duplicate():
+    cache = SemanticQueryCache(similarity_threshold=0.8)
+    cache.set("Do you have experience with stakeholder management in agile delivery teams?", 'yes')
+    cache.set("Have you worked with ServiceNow and Jira for help desk support?", 'yes')
+
+    assert cache.get("Do you have no experience with stakeholder management in agile delivery teams?") is None
+    assert cache.get("Have you not worked with ServiceNow and Jira for help desk support?") is None
+    assert cache.get("Do you have experience with stakeholder management in agile delivery teams at work?") == 'yes'
+
+def test_metrics_export_response_cache_sizing_counters(monkeypatch):
+    import digital_twin_mcp_server_optimized as retrieval
+    from metrics import registry
+
+    monkeypatch.setattr(retrieval, 'response_cache', SemanticQueryCache(maxsize=1))
+    retrieval.response_cache.set("What are your Python skills?", 'python')
+    retrieval.response_cache.set("Where did you study?", 'school')
+
+    rendered = registry.render()
+    assert 'twin_response_cache_entries 1' in rendered
+    assert 'twin_response_cache_capacity 1' in rendered
+    assert 'twin_response_cache_evictions_total 1' in rendered
+    assert 'twin_response_cache_expirations_total 0' in rendered
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from singleflight import SingleFlight
+
+CALLERS = 8
+
+def run_concurrently(flight, fn):
+    """Start CALLERS threads on one key; returns their (result, shared) pairs or exceptions"""
+    outcomes = [None] * CALLERS
+    threads = []
+
+    def call(slot):
+        try:
+            outcomes[slot] = flight.do('python skills', fn)
+        except Exception as e:
+            outcomes[slot] = e
+
+    for slot in range(CALLERS):
+        threads.append(threading.Thread(target=call, args=(slot,)))
+        threads[-1].start()
+    return threads, outcomes
+
+def wait_for_waiters(flight, started):
+    started.wait(5)
+    while flight.coalesced < CALLERS - 1:
+        time.sleep(0.001)
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'answer'
+
+    threads, outcomes = run_concurrently(flight, compute)
+    wait_for_waiters(flight, started)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(outcomes, key=lambda outcome: outcome[1]) == [('answer', False)] + [('answer', True)] * (CALLERS - 1)
+    assert flight.stats() == {'leaders': 1, 'coalesced': CALLERS - 1, 'in_flight': 0}
+
+def test_concurrent_callers_all_see_the_exception_and_the_key_is_released():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise TimeoutError("vector DB timed out")
+
+    threads, outcomes = run_concurrently(flight, compute)
+    wait_for_waiters(flight, started)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(isinstance(outcome, TimeoutError) for outcome in outcomes)
+    assert flight.in_flight() == 0
+    assert flight.do('python skills', lambda: 'retried') == ('retried', False)
@@ -0,0 +1,52 @@
+import json
+
+from lexical_index import BM25Index
+from local_vector import VECTOR_DIM, LocalVectorIndex
+from twin_chunks import build_chunks, chunk_search_text
+from twin_registry import DEFAULT_TWIN_ID, TwinProfile, TwinRegistry
+
+TWIN = {
+    'personalInfo': {'name': 'Test Twin', 'title': 'Analyst',
+                     'core_competencies': {'process_mapping': 'BPMN and value streams'}},
+    'professional_experience': [{'company': 'Acme', 'position': 'Analyst', 'duration': '2021',
+                                 'description': 'Mapped processes'}],
+}
+
+def make_registry(tmp_path, budget_bytes):
+    twins = tmp_path / 'twins'
+    twins.mkdir()
+    for twin_id in ('alpha', 'beta'):
+        (twins / f'{twin_id}.json').write_text(json.dumps(TWIN), encoding='utf-8')
+    default_file = tmp_path / 'default.json'
+    default_file.write_text(json.dumps(TWIN), encoding='utf-8')
+    return TwinRegistry(str(twins), TwinProfile(DEFAULT_TWIN_ID, str(default_file)), memory_budget_bytes=budget_bytes)
+
+def build_vector_index(profile):
+    index = LocalVectorIndex(lambda: build_chunks(profile.data()))
+    index.build()
+    return index
+
+def test_footprint_includes_derived_indexes(tmp_path):
+    profile = make_registry(tmp_path, 1e12).get('alpha')
+    data_only = profile.footprint
+    chunks = build_chunks(profile.data())
+
+    lexical = profile.derived('lexical_index', lambda p: BM25Index.build(
+        (chunk['id'], chunk['type'], chunk_search_text(chunk)) for chunk in chunks))
+    vectors = profile.derived('vector_index', build_vector_index)
+    # The same index reachable through a tuple (like an artifact) is not counted twice
+    profile.derived('artifact', lambda p: (chunks, lexical))
+
+    assert profile.footprint == data_only + lexical.memory_bytes() + vectors.memory_bytes()
+    assert vectors.memory_bytes() >= len(chunks) * VECTOR_DIM * 4
+
+def test_derived_indexes_count_against_the_memory_budget(tmp_path):
+    registry = make_registry(tmp_path, budget_bytes=len(build_chunks(TWIN)) * VECTOR_DIM * 4 * 1.5)
+    registry.get('alpha').derived('vector_index', build_vector_index)
+    registry.get('beta').derived('vector_index', build_vector_index)
+
+    registry.get('beta')
+    registry._evict(keep='beta')
+
+    assert registry.stats()['resident'] == 1
+    assert registry.evictions == 1
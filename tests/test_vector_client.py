@@ -0,0 +1,91 @@
+import pytest
+
+import vector_client
+from vector_client import CircuitBreaker, CircuitOpenError, ResilientIndex
+
+class FakeClock:
+    """Stands in for the time module inside vector_client; sleep() advances monotonic()"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class FlakyIndex:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def query(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("connection reset")
+        return ['match']
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(vector_client, 'time', clock)
+    return clock
+
+def test_breaker_opens_after_threshold_goes_half_open_after_cooldown_and_closes_on_success(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+    clock.sleep(29.9)
+    assert not breaker.allow_request()
+    clock.sleep(0.1)
+    assert breaker.allow_request()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow_request()  # Only one trial call while half-open
+
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.consecutive_failures == 0
+    assert breaker.allow_request()
+
+def test_failed_half_open_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.sleep(30)
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == 'open' and breaker.trips == 2
+    assert not breaker.allow_request()
+
+def test_retries_stop_at_the_deadline(clock, monkeypatch):
+    monkeypatch.setattr(vector_client.random, 'uniform', lambda low, high: 0.4)
+    index = FlakyIndex(failures=100)
+    client = ResilientIndex(index, CircuitBreaker(failure_threshold=100), max_retries=50, deadline=1.0)
+
+    with pytest.raises(ConnectionError):
+        client.query(data='python')
+
+    # Attempts at t=0, 0.4 and 0.8; the next backoff would start past the deadline
+    assert index.calls == 3
+    assert clock.now - 1000.0 == pytest.approx(0.8)
+    assert client.breaker.consecutive_failures == 1
+
+def test_transient_failure_is_retried_and_open_breaker_fails_fast(clock):
+    index = FlakyIndex(failures=1)
+    client = ResilientIndex(index, CircuitBreaker(failure_threshold=1), max_retries=2, deadline=3.0)
+
+    assert client.query(data='python') == ['match']
+    assert index.calls == 2
+
+    client.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        client.query(data='python')
+    assert index.calls == 2
@@ -0,0 +1,150 @@
+"""
+Digital Twin Chunking
+Splits mytwin_refined.json into retrieval chunks using the same metadata shape
+the vector index stores (type, content, company, skill_name, question...).
+Display fields (key_achievement, answer) are derived here, once per load/ingest,
+so answering a query never re-scans chunk content.
+"""
+
+import re
+from typing import List, Dict, Any, NamedTuple
+
+# A content line mentioning any of these is an experience's headline result
+KEY_ACHIEVEMENT_MARKERS = ('achievement', 'key', 'result', 'improvement')
+QA_ANSWER_PREFIX = 'Answer: '
+
+class ChunkRecord(NamedTuple):
+    """
+    Compact, display-ready view of a chunk or vector hit
+    display is the finished response line ('' when the chunk has nothing to show);
+    metadata is the chunk's own dict, shared rather than copied
+    """
+    id: str
+    type: str
+    score: float
+    display: str
+    metadata: Dict[str, Any]
+
+def key_achievement_line(content: str) -> str:
+    """First content line that reads as a headline result, or ''"""
+    for line in content.split('\n'):
+        lowered = line.lower()
+        if any(marker in lowered for marker in KEY_ACHIEVEMENT_MARKERS):
+            return line
+    return ''
+
+def qa_answer(content: str) -> str:
+    """The answer part of an interview_qa chunk's content"""
+    return content.split(QA_ANSWER_PREFIX, 1)[-1]
+
+def slugify(text: str) -> str:
+    """Build a stable, id-safe slug from free text"""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+def build_chunks(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Convert the digital twin profile into a flat list of chunks
+    Each chunk has a stable 'id', a 'type', display 'content' and type-specific metadata
+    """
+    chunks = []
+    personal_info = data.get('personalInfo', {})
+
+    if personal_info:
+        chunks.append({
+            'id': 'personal-info',
+            'type': 'personal_info',
+            'name': personal_info.get('name', ''),
+            'title': personal_info.get('title', ''),
+            'location': personal_info.get('location', ''),
+            'summary': personal_info.get('summary', ''),
+            'content': '\n'.join(filter(None, [
+                personal_info.get('name', ''),
+                personal_info.get('title', ''),
+                personal_info.get('location', ''),
+                personal_info.get('summary', ''),
+                personal_info.get('elevator_pitch', ''),
+            ])),
+        })
+
+    for skill_key, description in personal_info.get('core_competencies', {}).items():
+        chunks.append({
+            'id': f"skill-{slugify(skill_key)}",
+            'type': 'core_competency',
+            'skill_name': skill_key.replace('_', ' ').title(),
+            'content': description,
+        })
+
+    for exp in data.get('professional_experience', []):
+        lines = [exp.get('description', '')]
+        lines.extend(exp.get('achievements', []))
+        if exp.get('recognition'):
+            lines.append(f"Recognition: {exp['recognition']}")
+        content = '\n'.join(filter(None, lines))
+        chunks.append({
+            'id': f"experience-{slugify(exp.get('company', ''))}-{slugify(exp.get('duration', ''))}",
+            'type': 'professional_experience',
+            'company': exp.get('company', 'Unknown'),
+            'position': exp.get('position', 'Unknown'),
+            'duration': exp.get('duration', 'Unknown'),
+            'content': content,
+            'key_achievement': key_achievement_line(content),
+        })
+
+    for category, qa_list in data.get('interview_qa', {}).items():
+        for i, qa in enumerate(qa_list):
+            question = qa.get('question', '')
+            chunks.append({
+                'id': f"qa-{slugify(category)}-{i}",
+                'type': 'interview_qa',
+                'question': question,
+                'category': category,
+                'keywords': qa.get('keywords', []),
+                'content': f"Question: {question}\n{QA_ANSWER_PREFIX}{qa.get('answer', '')}",
+                'answer': qa.get('answer', ''),
+            })
+
+    training = data.get('professional_development', {}).get('recent_training', {})
+    if training:
+        chunks.append({
+            'id': 'professional-development',
+            'type': 'professional_development',
+            'name': training.get('name', ''),
+            'duration': training.get('duration', ''),
+            'content': '\n'.join(filter(None, [
+                training.get('name', ''),
+                training.get('project', ''),
+                *training.get('skills_demonstrated', []),
+            ])),
+        })
+
+    for edu in data.get('education', []):
+        chunks.append({
+            'id': f"education-{slugify(edu.get('institution', ''))}",
+            'type': 'education',
+            'institution': edu.get('institution', ''),
+            'duration': edu.get('duration', ''),
+            'content': f"{edu.get('degree', '')} - {edu.get('institution', '')} ({edu.get('duration', '')})",
+        })
+
+    return chunks
+
+# Words a recruiter uses for each section but the profile text rarely contains
+TYPE_SEARCH_LABELS = {
+    'personal_info': 'about name contact location summary',
+    'core_competency': 'core skill competency ability',
+    'professional_experience': 'experience work job role',
+    'professional_development': 'training course certification',
+    'education': 'education degree study',
+}
+
+def chunk_search_text(chunk: Dict[str, Any]) -> str:
+    """Text used for lexical and local vector indexing of a chunk"""
+    parts = [
+        TYPE_SEARCH_LABELS.get(chunk.get('type', ''), ''),
+        chunk.get('company', ''),
+        chunk.get('position', ''),
+        chunk.get('skill_name', ''),
+        chunk.get('content', ''),
+        ' '.join(chunk.get('keywords', [])),
+    ]
+    return ' '.join(part for part in parts if part)
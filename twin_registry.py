@@ -0,0 +1,233 @@
+"""
+Twin Registry
+Serves many digital twins from one process. Each twin ID maps to a TwinProfile: its JSON
+(re-read when edited) plus whatever is derived from it (chunks, BM25 index, Q&A table,
+vector view), built lazily on first use. Profiles load on demand and the least recently
+used are evicted when they sit idle or the estimated footprint (data plus every derived
+index that reports memory_bytes()) exceeds the memory budget;
+the default twin is pinned. The twin a request is for travels in a contextvar, so work
+submitted to thread pools with copy_context() searches the right profile.
+
+    twins/<twin_id>.json                  profile data
+    twins/<twin_id>.twin_index/           optional prebuilt artifact (index_artifact.py)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TWIN_ID = 'default'
+TWIN_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')  # Also keeps IDs safe as file names
+TWIN_MEMORY_BUDGET_MB = float(os.getenv("TWIN_MEMORY_BUDGET_MB", "512"))
+TWIN_IDLE_SECONDS = float(os.getenv("TWIN_IDLE_SECONDS", "1800"))
+TWIN_FOOTPRINT_FACTOR = 8  # Estimated resident bytes of parsed data and chunks per raw JSON byte
+TWIN_SWEEP_INTERVAL_SECONDS = 60.0
+DATA_RELOAD_CHECK_SECONDS = 2.0  # How often to stat a twin's JSON for edits
+
+class UnknownTwinError(KeyError):
+    pass
+
+_current_twin: ContextVar[str] = ContextVar('current_twin', default=DEFAULT_TWIN_ID)
+
+def current_twin_id() -> str:
+    return _current_twin.get()
+
+@contextmanager
+def use_twin(twin_id: Optional[str]) -> Iterator[None]:
+    """Route retrieval inside the block to twin_id (None or '' means the default twin)"""
+    token = _current_twin.set(twin_id or DEFAULT_TWIN_ID)
+    try:
+        yield
+    finally:
+        _current_twin.reset(token)
+
+def derived_bytes(values: Iterable[Any]) -> int:
+    """
+    Estimated resident bytes of derived objects that report memory_bytes(), looking inside
+    tuples (e.g. an index artifact); an object shared by several derivatives counts once
+    """
+    seen = set()
+    total = 0
+    stack = list(values)
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if hasattr(value, 'memory_bytes'):
+            total += value.memory_bytes()
+        elif isinstance(value, tuple):
+            stack.extend(value)
+    return total
+
+class TwinProfile:
+    """One twin's data plus lazily built, memoized derivatives that are dropped when the data changes"""
+
+    def __init__(self, twin_id: str, data_file: str, artifact_dir: Optional[str] = None,
+                 on_change: Optional[Callable[['TwinProfile'], None]] = None,
+                 reload_check_seconds: float = DATA_RELOAD_CHECK_SECONDS):
+        self.twin_id = twin_id
+        self.data_file = data_file
+        self.artifact_dir = artifact_dir
+        self.on_change = on_change
+        self.reload_check_seconds = reload_check_seconds
+        self.last_used = time.monotonic()
+        self.data_footprint = 0  # Estimated bytes of the parsed data, set when it is first read
+        self._data: Optional[Dict[str, Any]] = None
+        self._signature: Optional[tuple] = None
+        self._content_hash: Optional[str] = None
+        self._checked_at = 0.0
+        self._data_lock = threading.Lock()
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.RLock()  # Builders may use other derivatives
+
+    def data(self) -> Dict[str, Any]:
+        """Parsed twin JSON, re-read when its mtime/size changed and its content hash differs"""
+        now = time.monotonic()
+        if self._data is not None and now - self._checked_at < self.reload_check_seconds:
+            return self._data
+
+        with self._data_lock:
+            stat = os.stat(self.data_file)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            self._checked_at = now
+            if self._data is not None and signature == self._signature:
+                return self._data
+
+            with open(self.data_file, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            self._signature = signature
+            if self._data is not None and digest == self._content_hash:
+                # Touched but not edited
+                return self._data
+
+            changed = self._data is not None
+            self._data = json.loads(raw.decode('utf-8'))
+            self._content_hash = digest
+            self.data_footprint = len(raw) * TWIN_FOOTPRINT_FACTOR
+
+        if changed:
+            logger.info(f"🔄 Twin '{self.twin_id}' data changed on disk, invalidating caches and indexes")
+            self.invalidate()
+            if self.on_change is not None:
+                self.on_change(self)
+        return self._data
+
+    @property
+    def footprint(self) -> int:
+        """Estimated resident bytes: the data plus whatever has been derived from it so far"""
+        return self.data_footprint + derived_bytes(list(self._derived.values()))
+
+    def derived(self, name: str, build: Callable[['TwinProfile'], Any]) -> Any:
+        """build(profile) once per data load, then the memoized result"""
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._derived_lock:
+            if name not in self._derived:
+                self._derived[name] = build(self)
+            return self._derived[name]
+
+    def invalidate(self) -> None:
+        with self._derived_lock:
+            self._derived.clear()
+
+class TwinRegistry:
+    """Twin ID -> TwinProfile, loaded on demand from data_dir and evicted LRU under a memory budget"""
+
+    def __init__(self, data_dir: str, default_profile: TwinProfile,
+                 memory_budget_bytes: float = TWIN_MEMORY_BUDGET_MB * 1024 * 1024,
+                 idle_seconds: float = TWIN_IDLE_SECONDS,
+                 on_change: Optional[Callable[[TwinProfile], None]] = None):
+        self.data_dir = data_dir
+        self.default_profile = default_profile
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_seconds = idle_seconds
+        self.on_change = on_change
+        self._profiles: 'OrderedDict[str, TwinProfile]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._swept_at = time.monotonic()
+        self.loads = 0
+        self.evictions = 0
+
+    def data_file(self, twin_id: str) -> str:
+        return os.path.join(self.data_dir, f"{twin_id}.json")
+
+    def exists(self, twin_id: Optional[str]) -> bool:
+        if not twin_id or twin_id == DEFAULT_TWIN_ID:
+            return True
+        return twin_id in self._profiles or (
+            bool(TWIN_ID_PATTERN.match(twin_id)) and os.path.isfile(self.data_file(twin_id)))
+
+    def get(self, twin_id: str) -> TwinProfile:
+        """The twin's profile, loading it on first use; raises UnknownTwinError"""
+        now = time.monotonic()
+        if twin_id == DEFAULT_TWIN_ID:
+            self.default_profile.last_used = now
+            return self.default_profile
+
+        with self._lock:
+            profile = self._profiles.get(twin_id)
+            if profile is not None:
+                profile.last_used = now
+                self._profiles.move_to_end(twin_id)
+                if now - self._swept_at >= TWIN_SWEEP_INTERVAL_SECONDS:
+                    self._evict(keep=twin_id)
+                return profile
+
+        if not self.exists(twin_id):
+            raise UnknownTwinError(twin_id)
+        profile = TwinProfile(twin_id, self.data_file(twin_id), os.path.join(self.data_dir, f"{twin_id}.twin_index"),
+                              on_change=self.on_change)
+        # Size the profile up front so the budget check below sees it
+        profile.data()
+
+        with self._lock:
+            existing = self._profiles.get(twin_id)
+            if existing is not None:
+                return existing
+            self._profiles[twin_id] = profile
+            self.loads += 1
+            self._evict(keep=twin_id)
+        logger.info(f"✅ Twin '{twin_id}' loaded ({len(self._profiles)} resident)")
+        return profile
+
+    def _evict(self, keep: str) -> None:
+        """Drop idle profiles, then least recently used ones until under budget (caller holds the lock)"""
+        now = time.monotonic()
+        self._swept_at = now
+        for twin_id, profile in list(self._profiles.items()):
+            if twin_id != keep and now - profile.last_used > self.idle_seconds:
+                del self._profiles[twin_id]
+                self.evictions += 1
+        footprint = sum(profile.footprint for profile in self._profiles.values())
+        while footprint > self.memory_budget_bytes and len(self._profiles) > 1:
+            twin_id, profile = next(iter(self._profiles.items()))
+            if twin_id == keep:
+                break
+            del self._profiles[twin_id]
+            footprint -= profile.footprint
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            footprint = sum(profile.footprint for profile in self._profiles.values())
+            return {
+                'resident': len(self._profiles),
+                'estimated_mb': round(footprint / (1024 * 1024), 2),
+                'budget_mb': round(self.memory_budget_bytes / (1024 * 1024), 2),
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,201 @@
+"""
+Resilient Vector Client
+Wraps upstash_vector.Index with a shared keep-alive HTTP pool, per-call timeouts,
+bounded retry with jittered backoff and a circuit breaker that fails fast (so callers
+go straight to their local fallback) while the vector DB is down or out of quota.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Client policy
+VECTOR_CALL_TIMEOUT_SECONDS = float(os.getenv("VECTOR_CALL_TIMEOUT_SECONDS", "2.0"))  # Per HTTP attempt
+VECTOR_CONNECT_TIMEOUT_SECONDS = 1.0
+VECTOR_DEADLINE_SECONDS = float(os.getenv("VECTOR_DEADLINE_SECONDS", "3.0"))  # No retry starts past this
+VECTOR_MAX_RETRIES = int(os.getenv("VECTOR_MAX_RETRIES", "2"))
+VECTOR_BACKOFF_BASE_SECONDS = 0.05
+VECTOR_BACKOFF_MAX_SECONDS = 0.5
+HTTP_MAX_CONNECTIONS = 50
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+# Circuit breaker policy
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures before opening
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+BREAKER_QUOTA_COOLDOWN_SECONDS = 300.0
+
+# Errors that retrying cannot fix; they open the breaker immediately
+NON_RETRYABLE_MARKERS = ('quota', 'rate limit', 'authentication', 'unauthorized', 'forbidden')
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the vector DB while the breaker is open"""
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker
+    While open every call fails fast; after the cooldown a single trial call is let through
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() >= self.opened_until:
+                # Let exactly one trial call through
+                self.state = 'half_open'
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != 'closed':
+                logger.info("✅ Vector DB recovered, closing circuit breaker")
+            self.state = 'closed'
+            self.consecutive_failures = 0
+
+    def record_failure(self, cooldown: Optional[float] = None, trip: bool = False) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if trip or self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                cooldown = cooldown or self.cooldown
+                self.state = 'open'
+                self.opened_until = time.monotonic() + cooldown
+                self.trips += 1
+                logger.warning(f"⚡ Vector DB circuit breaker open for {cooldown}s "
+                               f"after {self.consecutive_failures} failure(s)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'trips': self.trips,
+                'rejected_calls': self.rejected,
+                'retry_in_seconds': round(max(0.0, self.opened_until - time.monotonic()), 1) if self.state == 'open' else 0.0,
+            }
+
+def is_non_retryable(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in NON_RETRYABLE_MARKERS)
+
+def create_http_client() -> Any:
+    """Shared keep-alive connection pool with our timeouts (the SDK default read timeout is 600s)"""
+    import httpx
+
+    return httpx.Client(
+        timeout=httpx.Timeout(VECTOR_CALL_TIMEOUT_SECONDS, connect=VECTOR_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+
+class ResilientIndex:
+    """
+    Drop-in wrapper for any Index-like object (query, query_many, upsert, delete, info)
+    Retries transient failures with full-jitter backoff inside VECTOR_DEADLINE_SECONDS and
+    reports outcomes to a (possibly shared) circuit breaker.
+    """
+
+    def __init__(self, index: Any, breaker: Optional[CircuitBreaker] = None,
+                 max_retries: int = VECTOR_MAX_RETRIES, deadline: float = VECTOR_DEADLINE_SECONDS):
+        self.index = index
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.deadline = deadline
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Vector DB circuit breaker is open")
+
+        deadline = time.monotonic() + self.deadline
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = getattr(self.index, method)(*args, **kwargs)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                last_error = e
+                if is_non_retryable(e):
+                    self.breaker.record_failure(cooldown=BREAKER_QUOTA_COOLDOWN_SECONDS, trip=True)
+                    raise
+
+            backoff = random.uniform(0, min(VECTOR_BACKOFF_MAX_SECONDS, VECTOR_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if attempt == self.max_retries or time.monotonic() + backoff >= deadline:
+                break
+            time.sleep(backoff)
+
+        self.breaker.record_failure()
+        raise last_error
+
+    def query(self, *args: Any, **kwargs: Any) -> List[Any]:
+        return self._call('query', *args, **kwargs)
+
+    def query_many(self, *args: Any, **kwargs: Any) -> List[List[Any]]:
+        return self._call('query_many', *args, **kwargs)
+
+    def upsert(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call('upsert', *args, **kwargs)
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call('delete', *args, **kwargs)
+
+    def info(self) -> Any:
+        return self._call('info')
+
+class NamespacedIndex:
+    """
+    One Upstash namespace of a shared index, e.g. one twin's vectors
+    Shares the wrapped client's HTTP pool, retries and circuit breaker
+    """
+
+    def __init__(self, index: Any, namespace: str):
+        self.index = index
+        self.namespace = namespace
+        self.breaker = getattr(index, 'breaker', None)
+
+    def query(self, *args: Any, **kwargs: Any) -> List[Any]:
+        return self.index.query(*args, namespace=self.namespace, **kwargs)
+
+    def query_many(self, *args: Any, **kwargs: Any) -> List[List[Any]]:
+        return self.index.query_many(*args, namespace=self.namespace, **kwargs)
+
+    def upsert(self, *args: Any, **kwargs: Any) -> Any:
+        return self.index.upsert(*args, namespace=self.namespace, **kwargs)
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        return self.index.delete(*args, namespace=self.namespace, **kwargs)
+
+    def info(self) -> Any:
+        return self.index.info()
+
+def create_upstash_index(url: Optional[str], token: Optional[str], http_client: Any,
+                         breaker: CircuitBreaker) -> ResilientIndex:
+    """Upstash Index on the shared pool, with SDK-level retries off (we retry with jitter instead)"""
+    from upstash_vector import Index
+
+    index = Index(url=url, token=token, retries=0)
+    if hasattr(index, '_client'):
+        index._client.close()
+        index._client = http_client
+    return ResilientIndex(index, breaker)